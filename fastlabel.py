@@ -1,6 +1,10 @@
-import threading, queue
-import os, math, traceback
-from typing import List, Tuple, Optional, Dict, Set
+import threading, queue, heapq
+from collections import OrderedDict, Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+import os, re, traceback, contextlib, json, importlib.util, struct
+from array import array
+from functools import lru_cache
+from typing import List, Tuple, Optional, Dict, Set, Deque
 
 SHOW_STATUS_BAR = False 
 HEADER_STATUS_CHARS = 28
@@ -10,19 +14,52 @@ def log_exc(where: str, ex: BaseException):
     print(f"\n[ERROR] in {where}: {type(ex).__name__} - {ex}")
     traceback.print_exc()
 # ---------- deps ----------
-from PIL import Image, ImageTk
+from PIL import Image, ImageTk, ImageDraw, ImageColor
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, simpledialog, colorchooser, font as tkfont
 import tkinter as tk
 
+# ultralytics (and torch behind it) is imported on first prefill/scan, not at startup
+YOLO = None
+_YOLO_OK: Optional[bool] = None   # None = not tried yet
+
+def _yolo_available() -> bool:
+    global YOLO, _YOLO_OK
+    if _YOLO_OK is None:
+        try:
+            from ultralytics import YOLO as _YOLO
+            YOLO = _YOLO
+            _YOLO_OK = True
+        except Exception:
+            _YOLO_OK = False
+    return bool(_YOLO_OK)
+
+def _yolo_installed() -> bool:
+    """Cheap check (no import) used for UI defaults."""
+    try:
+        return importlib.util.find_spec("ultralytics") is not None
+    except Exception:
+        return False
+
 try:
-    from ultralytics import YOLO
-    _YOLO_OK = True
+    import numpy as np
+    _NP_OK = True
 except Exception:
-    _YOLO_OK = False
+    _NP_OK = False
+
+try:
+    from numba import njit
+    _NUMBA_OK = True
+except Exception:
+    _NUMBA_OK = False
 
 # Dir names
 OUTPUT_LBL_DIR = "yoloLabels"
+INDEX_CACHE_FILE = ".fastlabel_index.json"   # sidecar in OUTPUT_LBL_DIR
+INDEX_IO_WORKERS = min(32, (os.cpu_count() or 1) * 4)   # stat/read threads for the project index
+INDEX_IO_MIN_PATHS = 64                                  # below this a pool costs more than it hides
+SCAN_DECODE_WORKERS = 3   # Scan All: image decode threads feeding the next batch
+SCAN_PREFETCH_BATCHES = 2 # Scan All: batches decoded ahead of the one being predicted
 
 YOLO_LOCKED_ID   = 0
 YOLO_UNLOCKED_ID = 1
@@ -50,21 +87,55 @@ GRID_TARGET_STEP_CANVAS = 64
 
 HANDLE_SIZE = 8
 MIN_SIDE    = 4
-try:
-    import torch
-    HAS_CUDA = torch.cuda.is_available()
-    if HAS_CUDA:
-        torch.backends.cudnn.benchmark = True  
-except Exception:
-    HAS_CUDA = False
+NUMBA_MIN_BOXES = 256   # below this the NumPy mask is faster than a JIT call
+HIT_GRID_CELLS  = 16    # spatial hash is HIT_GRID_CELLS x HIT_GRID_CELLS over the image
+HIT_GRID_MIN_BOXES = 512
+PASTE_NP_MIN = 8          # pasted groups at least this big are clipped with NumPy
+SNAP_NP_MIN  = 32         # snap targets are gathered with NumPy from this many boxes up
+DELETE_INPLACE_MAX = 32   # delete this many boxes by index; larger selections filter the list once
+# resize handle -> (x sign, y sign) of the edges it drags; -1 = left/top, +1 = right/bottom, 0 = fixed
+HANDLE_SIGNS = {"nw": (-1, -1), "n": (0, -1), "ne": (1, -1),
+                "w":  (-1,  0),               "e":  (1,  0),
+                "sw": (-1,  1), "s": (0,  1), "se": (1,  1)}
+# torch is imported with the first model use, like ultralytics; the window never waits for it
+torch = None
+_AUTO_DEVICE: Optional[Tuple[str, bool]] = None   # (device, half) once resolved
+
+def _auto_device() -> Tuple[str, bool]:
+    """YOLO device + fp16 flag: cuda (half), else mps, else cpu. Imports torch on first call."""
+    global torch, _AUTO_DEVICE
+    if _AUTO_DEVICE is None:
+        try:
+            import torch as _torch
+            torch = _torch
+            if torch.cuda.is_available():
+                torch.backends.cudnn.benchmark = True
+                _AUTO_DEVICE = ("cuda", True)
+            elif getattr(torch.backends, "mps", None) and torch.backends.mps.is_available():
+                _AUTO_DEVICE = ("mps", False)
+            else:
+                _AUTO_DEVICE = ("cpu", False)
+        except Exception:
+            _AUTO_DEVICE = ("cpu", False)
+    return _AUTO_DEVICE
 
 YOLO_IMG_SIZE = 640
 YOLO_BATCH    = 8       
+SCAN_MAX_BATCH = 32     # "Scan batch" ceiling; TensorRT engines are exported with this max batch so any setting fits
 YOLO_MAX_DET  = 100      
-YOLO_DEVICE   = "cuda" if HAS_CUDA else "cpu"
-YOLO_HALF     = bool(HAS_CUDA)  
 
 PAN_PIXELS_PER_NOTCH = 30
+IMAGE_LRU_SIZE = 4      # decoded neighbours kept for instant prev/next
+PYRAMID_LEVELS = (0.5, 0.25, 0.125)   # cached downscales used as resize sources
+SURFACE_CACHE_SIZE = 4                 # recent display sizes kept as ready PhotoImages
+OVERLAY_PAN_MARGIN = 256               # box raster extends this far past each canvas edge; pans inside it just move the item
+
+def _inference_mode():
+    """torch.inference_mode() when torch is importable, else a no-op context."""
+    try:
+        return torch.inference_mode()
+    except Exception:
+        return contextlib.nullcontext()
 
 PALETTE = {
     "bg":        "#1a1f27",
@@ -92,6 +163,48 @@ EXTRA_COLORS = [
 def ensure_dirs():
     os.makedirs(OUTPUT_LBL_DIR, exist_ok=True)
 
+def probe_image_size(path: str) -> Tuple[int, int]:
+    """(width, height) from the PNG/JPEG/WebP header bytes; falls back to PIL for other formats."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(32)
+            if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+                w, h = struct.unpack(">II", head[16:24])
+                return int(w), int(h)
+            if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+                fmt = head[12:16]
+                if fmt == b"VP8 ":
+                    w, h = struct.unpack("<HH", head[26:30])
+                    return w & 0x3FFF, h & 0x3FFF
+                if fmt == b"VP8L":
+                    b = head[21:25]
+                    w = 1 + (((b[1] & 0x3F) << 8) | b[0])
+                    h = 1 + (((b[3] & 0x0F) << 10) | (b[2] << 2) | ((b[1] & 0xC0) >> 6))
+                    return w, h
+                if fmt == b"VP8X":
+                    w = 1 + int.from_bytes(head[24:27], "little")
+                    h = 1 + int.from_bytes(head[27:30], "little")
+                    return w, h
+            if head[:2] == b"\xff\xd8":
+                f.seek(2)
+                while True:
+                    marker = f.read(2)
+                    if len(marker) < 2 or marker[0] != 0xFF:
+                        break
+                    m = marker[1]
+                    if m in (0xD8, 0x01) or 0xD0 <= m <= 0xD7:
+                        continue
+                    seg_len = struct.unpack(">H", f.read(2))[0]
+                    # SOF0..SOF15 except DHT(C4), JPG(C8), DAC(CC)
+                    if 0xC0 <= m <= 0xCF and m not in (0xC4, 0xC8, 0xCC):
+                        h, w = struct.unpack(">xHH", f.read(5))
+                        return int(w), int(h)
+                    f.seek(seg_len - 2, os.SEEK_CUR)
+    except Exception:
+        pass
+    with Image.open(path) as im:
+        return im.size
+
 # ---------- scrollable sidebar ----------
 class ScrollableSidebar(ttk.Frame):
     def __init__(self, parent, width):
@@ -109,40 +222,25 @@ class ScrollableSidebar(ttk.Frame):
 
         self.canvas.pack(side=tk.LEFT, fill=tk.Y)
         self.vsb.pack(side=tk.RIGHT, fill=tk.Y)
-        self._install_global_wheel_router()
+        # wheel goes to the sidebar only while the pointer is over it
+        self.bind("<Enter>", self._on_pointer_enter, add="+")
+        self.bind("<Leave>", self._on_pointer_leave, add="+")
 
         self.inner.bind("<Configure>", self._on_inner_configure)
         self.canvas.bind("<Configure>", self._on_canvas_configure)
 
-    def _install_global_wheel_router(self):
-        # Capture wheel events app-wide, but route only if pointer is over the sidebar
-        self.bind_all("<MouseWheel>", self._wheel_router, add="+")      # Windows/macOS
-        self.bind_all("<Button-4>", lambda e: self._wheel_router_linux(e, +1), add="+")  # Linux up
-        self.bind_all("<Button-5>", lambda e: self._wheel_router_linux(e, -1), add="+")  # Linux down
-    
-    def _pointer_in_canvas(self) -> bool:
+    def _on_pointer_enter(self, _e=None):
+        self._bind_mousewheel(None)
+
+    def _on_pointer_leave(self, e):
+        # <Leave> also fires when moving onto a child widget; keep the binding then
         try:
-            px, py = self.winfo_pointerx(), self.winfo_pointery()
-            cx, cy = self.canvas.winfo_rootx(), self.canvas.winfo_rooty()
-            cw, ch = self.canvas.winfo_width(), self.canvas.winfo_height()
-            return (cx <= px < cx + cw) and (cy <= py < cy + ch)
+            w = self.winfo_containing(e.x_root, e.y_root)
+            if w is not None and str(w).startswith(str(self)):
+                return
         except Exception:
-            return False
-    
-    def _wheel_router(self, e):
-        if self._pointer_in_canvas():
-            # Reuse existing wheel logic
-            self._on_wheel(e)
-            return "break"  # stop it from reaching other widgets
-    
-    def _wheel_router_linux(self, e, direction: int):
-        if self._pointer_in_canvas():
-            if direction > 0:
-                self._on_wheel_linux_up(e)
-            else:
-                self._on_wheel_linux_down(e)
-            return "break"
-    
+            pass
+        self._unbind_mousewheel(None)
 
     def _on_inner_configure(self, _event=None):
         self.canvas.configure(scrollregion=self.canvas.bbox("all"))
@@ -177,6 +275,12 @@ class Box:
         self.x1, self.y1, self.x2, self.y2 = xa, ya, xb, yb
         self.cls = int(cls)
         self.selected = bool(selected)
+    @classmethod
+    def from_sorted(cls, x1:int, y1:int, x2:int, y2:int, c:int) -> "Box":
+        """Fast path for already-normalized int coords (x1<=x2, y1<=y2), e.g. YOLO output or saved labels."""
+        b = cls.__new__(cls)
+        b.x1, b.y1, b.x2, b.y2, b.cls, b.selected = x1, y1, x2, y2, c, False
+        return b
     def contains(self, x:int, y:int)->bool:
         return self.x1 <= x <= self.x2 and self.y1 <= y <= self.y2
     def size_ok(self, min_side:int=MIN_SIDE)->bool:
@@ -188,6 +292,189 @@ class Box:
         ny1 = min(max(self.y1 + dy, 0), max(ih - 1 - h, 0))
         self.x1, self.y1, self.x2, self.y2 = nx1, ny1, nx1 + w, ny1 + h
 
+# ---------- vectorized box queries ----------
+# Box rows are int32 [x1, y1, x2, y2, cls, selected]
+def boxes_to_array(boxes: List[Box]):
+    if not boxes:
+        return np.zeros((0, 6), dtype=np.int32)
+    return np.array([(b.x1, b.y1, b.x2, b.y2, b.cls, b.selected) for b in boxes], dtype=np.int32)
+
+def _np_topmost_hit(arr, hidden, x: int, y: int) -> int:
+    mask = (arr[:,0] <= x) & (x <= arr[:,2]) & (arr[:,1] <= y) & (y <= arr[:,3]) & ~hidden
+    idx = np.flatnonzero(mask)
+    return int(idx[-1]) if idx.size else -1
+
+def _np_marquee_mask(arr, hidden, x1: int, y1: int, x2: int, y2: int):
+    return (arr[:,2] >= x1) & (arr[:,0] <= x2) & (arr[:,3] >= y1) & (arr[:,1] <= y2) & ~hidden
+
+if _NUMBA_OK:
+    @njit(cache=True)
+    def _nb_topmost_hit(arr, hidden, x, y):
+        for i in range(arr.shape[0] - 1, -1, -1):
+            if hidden[i]:
+                continue
+            if arr[i, 0] <= x <= arr[i, 2] and arr[i, 1] <= y <= arr[i, 3]:
+                return i
+        return -1
+
+    @njit(cache=True)
+    def _nb_marquee_mask(arr, hidden, x1, y1, x2, y2):
+        out = np.zeros(arr.shape[0], dtype=np.bool_)
+        for i in range(arr.shape[0]):
+            if not hidden[i]:
+                out[i] = arr[i, 2] >= x1 and arr[i, 0] <= x2 and arr[i, 3] >= y1 and arr[i, 1] <= y2
+        return out
+
+# one YOLO row = exactly five whitespace-separated fields on a line
+_YOLO_ROW_RX = re.compile(r"^[ \t]*(\S+)[ \t]+(\S+)[ \t]+(\S+)[ \t]+(\S+)[ \t]+(\S+)[ \t]*$", re.M)
+
+def yolo_rows(text: str) -> array:
+    """Flat array('d') of cls,cx,cy,w,h for every well-formed line; malformed lines are skipped."""
+    out = array("d")
+    for m in _YOLO_ROW_RX.finditer(text):
+        try:
+            out.extend(map(float, m.groups()))
+        except ValueError:
+            del out[len(out) - len(out) % 5:]   # drop a partially extended row
+    return out
+
+def yolo_rows_array(text: str):
+    """(N,5) float64 rows of a label file: one vectorized parse when every line is clean, else the regex scan."""
+    # fast path only when every non-empty line is a 5-field row; a 4+6 split has the right total but misaligns
+    n_lines = sum(1 for ln in text.splitlines() if ln.strip())
+    if len(_YOLO_ROW_RX.findall(text)) == n_lines:
+        tokens = text.split()
+        try:
+            return np.array(tokens, dtype=np.float64).reshape(-1, 5)
+        except ValueError:
+            pass   # non-numeric token somewhere
+    rows = yolo_rows(text)
+    if not rows:
+        return np.zeros((0, 5), dtype=np.float64)
+    return np.frombuffer(rows, dtype=np.float64).reshape(-1, 5)
+
+def write_label_file(path: str, body: str):
+    """Write a label file as one encoded buffer through a raw fd: open, write, close, no buffered-IO layer."""
+    data = memoryview(body.encode("utf-8"))
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        while data:
+            data = data[os.write(fd, data):]
+    finally:
+        os.close(fd)
+
+def pack_snapshot(snap):
+    """(N,5) int32 [x1,y1,x2,y2,cls] array for a snapshot kept in memory; 20 B/box vs ~150 B of tuples."""
+    if not _NP_OK:
+        return list(snap)
+    return np.asarray(snap, dtype=np.int32).reshape(-1, 5)
+
+def class_mask(cls_ids) -> int:
+    """Bitmask with bit c set for every class id c; membership is then a shift+AND."""
+    m = 0
+    for c in cls_ids:
+        c = int(c)
+        if c >= 0:
+            m |= 1 << c
+    return m
+
+def mask_classes(mask: int) -> Set[int]:
+    out, c = set(), 0
+    while mask:
+        if mask & 1:
+            out.add(c)
+        mask >>= 1; c += 1
+    return out
+
+def topmost_hit(arr, hidden, x: int, y: int) -> int:
+    if _NUMBA_OK and len(arr) > NUMBA_MIN_BOXES:
+        return int(_nb_topmost_hit(arr, hidden, x, y))
+    return _np_topmost_hit(arr, hidden, x, y)
+
+def marquee_mask(arr, hidden, x1: int, y1: int, x2: int, y2: int):
+    if _NUMBA_OK and len(arr) > NUMBA_MIN_BOXES:
+        return _nb_marquee_mask(arr, hidden, x1, y1, x2, y2)
+    return _np_marquee_mask(arr, hidden, x1, y1, x2, y2)
+
+def _np_dup_pairs(arr, visible, iou_thr: float, center_px: float, area_frac: float):
+    """Same-class pairs (i<j) that look like duplicates; one vectorized row per i."""
+    a = arr[:, :4].astype(np.int64)
+    area = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    cx2 = a[:, 0] + a[:, 2]; cy2 = a[:, 1] + a[:, 3]   # doubled centers, compared against 2*center_px
+    cls = arr[:, 4]
+    out = []
+    for i in np.flatnonzero(visible):
+        j = i + 1 + np.flatnonzero(visible[i+1:] & (cls[i+1:] == cls[i]))
+        if not j.size:
+            continue
+        ix = np.maximum(0, np.minimum(a[i, 2], a[j, 2]) - np.maximum(a[i, 0], a[j, 0]))
+        iy = np.maximum(0, np.minimum(a[i, 3], a[j, 3]) - np.maximum(a[i, 1], a[j, 1]))
+        inter = ix * iy
+        uni = area[i] + area[j] - inter
+        with np.errstate(divide="ignore", invalid="ignore"):
+            iou = np.where((inter > 0) & (uni > 0), inter / uni, 0.0)
+            big = np.maximum(area[i], area[j])
+            close = (area[i] > 0) & (area[j] > 0) & (np.abs(area[i] - area[j]) / big <= area_frac)
+        near = (np.abs(cx2[i] - cx2[j]) / 2.0 <= center_px) & (np.abs(cy2[i] - cy2[j]) / 2.0 <= center_px)
+        for jj in j[(iou >= iou_thr) | (near & close)]:
+            out.append((int(i), int(jj)))
+    return out
+
+if _NUMBA_OK:
+    @njit(cache=True)
+    def _nb_dup_pairs(arr, visible, iou_thr, center_px, area_frac):
+        n = arr.shape[0]
+        out = np.empty((max(n, 16), 2), dtype=np.int64)
+        k = 0
+        for i in range(n):
+            if not visible[i]:
+                continue
+            ax1 = np.int64(arr[i, 0]); ay1 = np.int64(arr[i, 1]); ax2 = np.int64(arr[i, 2]); ay2 = np.int64(arr[i, 3])
+            aa = (ax2 - ax1) * (ay2 - ay1)
+            for j in range(i + 1, n):
+                if not visible[j] or arr[j, 4] != arr[i, 4]:
+                    continue
+                bx1 = np.int64(arr[j, 0]); by1 = np.int64(arr[j, 1]); bx2 = np.int64(arr[j, 2]); by2 = np.int64(arr[j, 3])
+                bb = (bx2 - bx1) * (by2 - by1)
+                dup = False
+                inter = max(0, min(ax2, bx2) - max(ax1, bx1)) * max(0, min(ay2, by2) - max(ay1, by1))
+                if inter > 0:
+                    uni = aa + bb - inter
+                    if uni > 0 and inter / uni >= iou_thr:
+                        dup = True
+                if not dup and aa > 0 and bb > 0 \
+                        and abs((ax1 + ax2) / 2.0 - (bx1 + bx2) / 2.0) <= center_px \
+                        and abs((ay1 + ay2) / 2.0 - (by1 + by2) / 2.0) <= center_px \
+                        and abs(aa - bb) / max(aa, bb) <= area_frac:
+                    dup = True
+                if dup:
+                    if k == out.shape[0]:
+                        grown = np.empty((2 * k, 2), dtype=np.int64)
+                        grown[:k] = out
+                        out = grown
+                    out[k, 0] = i; out[k, 1] = j
+                    k += 1
+        return out[:k]
+
+def dup_pairs(arr, visible) -> List[Tuple[int, int]]:
+    if _NUMBA_OK:
+        return [tuple(p) for p in _nb_dup_pairs(arr, visible, DUP_IOU_THRESH,
+                                                 float(DUP_CENTER_PX), DUP_AREA_FRAC).tolist()]
+    return _np_dup_pairs(arr, visible, DUP_IOU_THRESH, DUP_CENTER_PX, DUP_AREA_FRAC)
+
+def warm_jit():
+    """Compile (or load from the on-disk cache) the numba kernels with the dtypes the app passes."""
+    if not _NUMBA_OK:
+        return
+    try:
+        arr = np.zeros((1, 6), dtype=np.int32)
+        hidden = np.zeros(1, dtype=np.bool_)
+        _nb_topmost_hit(arr, hidden, 0, 0)
+        _nb_marquee_mask(arr, hidden, 0, 0, 0, 0)
+        _nb_dup_pairs(arr, hidden, DUP_IOU_THRESH, float(DUP_CENTER_PX), DUP_AREA_FRAC)
+    except Exception as ex:
+        log_exc("warm_jit", ex)
+
 # ---------- app ----------
 class LabelerApp(tk.Tk):
     def __init__(self):
@@ -201,6 +488,8 @@ class LabelerApp(tk.Tk):
         ensure_dirs()
         self._init_style()
         self.box_label_font = tkfont.Font(family="Segoe UI", size=9, weight="bold")
+        self._label_linespace = self.box_label_font.metrics("linespace")
+        self._label_widths: Dict[str, int] = {}
     
         # ---- background workers / scan state ----
         self._scan_thread = None
@@ -217,18 +506,46 @@ class LabelerApp(tk.Tk):
         self.image_idx: int = -1
         self.image: Optional[Image.Image] = None
     
+        # decoded-image prefetch (next/prev)
+        self._image_lru: "OrderedDict[str, Image.Image]" = OrderedDict()
+        self._image_lru_lock = threading.Lock()
+        self._prefetch_queue = queue.Queue()
+        self._prefetch_thread = None
+
+        # background autosave writes: (txt_path, body); one worker for the app's lifetime keeps them in order
+        self._save_q = queue.Queue()
+        self._saved_labels: Dict[str, Tuple[int, int]] = {}   # txt path -> (hash of body, mtime_ns) we wrote
+        self._pending_labels: Dict[str, int] = {}   # txt path -> hash of its newest queued, unwritten body
+        self._save_lock = threading.Lock()          # guards the two maps above across Tk/scan/save threads
+        self._save_thread = threading.Thread(target=self._save_worker, daemon=True)
+        self._save_thread.start()
+
         # per-image stats for navigator
         self.project_index: Dict[str, Dict[str, object]] = {}
+        self._tree_rebuild_after: Optional[str] = None
+        self._tree_state: Dict[str, Tuple[str, int]] = {}   # iid -> (text, boxes) currently shown
+        self._tree_current_iid: Optional[str] = None
+        self._index_cache: Optional[Dict[str, Dict]] = None   # mtime-keyed label counts (+ sidecar file)
     
         # cached display for performance
         self._cached_disp_size: Optional[Tuple[int,int]] = None
         self._cached_photo: Optional[ImageTk.PhotoImage] = None
-        self._cached_pil: Optional[Image.Image] = None
+        # (id(image), w, h) -> [PhotoImage, refined]; LRU so fit/zoom toggles skip the resize
+        self._surface_cache: "OrderedDict[Tuple[int,int,int], list]" = OrderedDict()
         self._image_item: Optional[int] = None
+        self._hq_after_id: Optional[str] = None
+        self._pyramid: Dict[float, Image.Image] = {}
+
+        # rasterized box outlines (one canvas item instead of one per box)
+        self._overlay_key = None
+        self._overlay_photo: Optional[ImageTk.PhotoImage] = None
+        self._overlay_item: Optional[int] = None
+        self._overlay_origin = (0, 0)   # (offset_x, offset_y) the raster was built at
     
         # edits / annotations
         self.dirty = False
-        self.annotations: Dict[str, List[Tuple[int,int,int,int,int]]] = {}
+        # per-image snapshots, packed by pack_snapshot(); rows unpack like (x1,y1,x2,y2,cls)
+        self.annotations: Dict[str, "np.ndarray"] = {}
     
         # view transform
         self.base_scale: float = 1.0
@@ -241,12 +558,15 @@ class LabelerApp(tk.Tk):
     
         # boxes & interaction
         self.boxes: List[Box] = []
+        self.boxes_arr = None   # NumPy mirror of self.boxes, refreshed by _sync_arr()
+        self._hit_grid = None
         self.dragging = False
         self.shift_held = False
         self.control_held = False
         self.alt_held = False
         self.drag_start: Tuple[int,int] = (0,0)
-        self.rubber_id: Optional[int] = None
+        self.rubber_id: Optional[int] = None       # the rubber band while it is shown
+        self._rubber_item: Optional[int] = None    # its canvas item, reused across drags
     
         self.moving = False
         self.move_idx: Optional[int] = None
@@ -256,6 +576,7 @@ class LabelerApp(tk.Tk):
         # multi-select group move
         self.move_selected_indices: List[int] = []
         self.move_start_boxes: Dict[int, Tuple[int,int,int,int]] = {}
+        self._move_group_bbox: Optional[Tuple[int,int,int,int]] = None   # union of move_start_boxes
     
         self.resizing = False
         self.resize_idx: Optional[int] = None
@@ -272,6 +593,43 @@ class LabelerApp(tk.Tk):
         self.show_box_labels = tk.BooleanVar(value=True)
         self.mouse_canvas_xy: Tuple[int,int] = (0,0)
         self.cursor_hidden = False
+        self._pending_motion: Optional[Tuple[int,int]] = None
+        self._motion_scheduled = False
+        self._pending_drag = None   # newest <B1-Motion> event not yet applied
+        self._drag_scheduled = False
+        self._last_drag_key = None   # (x, y, state, ctrl, alt) of the last applied drag sample
+        self._cursor_items: Dict[str, List[int]] = {}   # "xhair"/"cursorplus" -> live line ids, moved not recreated
+        self._grid_items: List[int] = []   # grid lines, moved with coords() and hidden when unused
+        # per-box canvas items kept across redraws (moved/recolored, created only for new indices)
+        self._sel_items: Dict[int, int] = {}      # box index -> selected outline rectangle
+        self._label_items: Dict[int, list] = {}   # box index -> [(bg, shadow, text) ids, style]
+        self._counts_text: Optional[str] = None
+        # leveled idle batch: 0=data, 1=UI rebuilds, 2=redraw flag, 3=last status text
+        self._pending = {0: [], 1: [], 2: False, 3: None}
+        self._batch_scheduled = False
+        self._modal_pool: Dict = {}
+        self._pending_nav_delta = 0
+        self._nav_scheduled = False
+        self._free_ids: List[int] = []   # heap of reclaimed class ids
+        self._id_watermark = 0
+        self._vis_widgets: Dict[int, Dict] = {}
+        self._yolo_txt_cache: Dict[str, str] = {}   # image path -> label txt path
+        self._yolo_force_cpu = False   # "Device" combobox; otherwise _auto_device() picks
+        self._last_classes_plain: Dict[int, Tuple[str, str, bool]] = {}   # shared by undo entries
+        self._last_boxes_packed = None   # last packed box array handed to an undo entry
+        self._filter_vals: Optional[List[str]] = None   # last values pushed to the filter combobox
+        self._ctx_key: Optional[Tuple] = None            # (cid, name) list the context menu was built for
+        self._size_cache: Dict[str, Tuple[int,int]] = {}   # image path -> (w, h) seen or probed
+        self._cls_hist: Counter = Counter()   # class id -> box count on the current image
+        self._root_geom: Optional[Tuple[int,int,int,int]] = None   # (rootx, rooty, w, h) from <Configure>
+        self._handles_cache: Optional[Tuple[Tuple, Tuple]] = None   # (box rect + view, handle squares)
+        self._hidden_cache: Optional[Set[int]] = None   # hidden class ids; reset by show-var writes and class table edits
+        self._canvas_wh: Optional[Tuple[int,int]] = None   # image canvas size from <Configure>
+        self._scale_key = None    # inputs of the last _compute_base_scale
+        self._clamp_key = None    # state right after the last _clamp_offsets
+        self._step_key = (None, 0)   # (scale, target) -> step of the last _nice_step
+        self._newclass_widgets: Dict[int, Dict] = {}
+        self._class_placeholders: Dict = {}
 
         self.grid_on   = tk.BooleanVar(value=False)
 
@@ -290,14 +648,25 @@ class LabelerApp(tk.Tk):
         self._prefill_running = False
         self._scan_all_running = False
         self._yolo_model_cache = {}
+        self._yolo_model_lock = threading.Lock()
+        self._prefill_lock = threading.Lock()
+        self._prefill_seq = 0
+        self._yolo_thread = None
+        self._yolo_jobs = queue.Queue()
+        self._yolo_results = queue.Queue()
+        self._export_running = False
+        self._yolo_warming = False
     
         # classes
         self.classes: Dict[int, Dict] = {}
+        self._class_draw_cache: Dict[int, Tuple[str, Tuple[int,int,int,int], str, str]] = {}
+        self._class_color_map: Dict[int, str] = {}
+        self._class_vis_map: Dict[int, bool] = {}
         self.var_new_cls = tk.IntVar(value=0)
     
         # history
-        self.undo_stack: List[Dict] = []
-        self.redo_stack: List[Dict] = []
+        self.undo_stack: Deque[Dict] = deque(maxlen=MAX_HISTORY)   # oldest entries drop off the left
+        self.redo_stack: Deque[Dict] = deque(maxlen=MAX_HISTORY)
     
         # context menu
         self.ctx: Optional[tk.Menu] = None
@@ -406,6 +775,7 @@ class LabelerApp(tk.Tk):
         self.canvas.bind("<Motion>",          self._wrap(self.on_mouse_move))
         self.canvas.bind("<Enter>",           self._wrap(self.on_canvas_enter))
         self.canvas.bind("<Leave>",           self._wrap(self.on_canvas_leave))
+        self.bind("<Configure>", self._on_root_configure, add="+")
         self.bind("<Control-a>", self._wrap(self.select_all_visible))
         self.bind("<Control-A>", self._wrap(self.select_all_visible))
         self.bind("g", self._wrap(lambda e: self._toggle_grid()))
@@ -476,49 +846,66 @@ class LabelerApp(tk.Tk):
 
 
     def _draw_grid_(self):
-        self.canvas.delete("grid")
-
-        if self.image is None:
+        if self.image is None or not self.grid_on.get():
+            self._hide_grid()
             return
 
         x0, y0, x1, y1 = self._image_rect_canvas()
         iw, ih = self.image.size
+        cw, ch = self.canvas_size()
+        sc, ox, oy = self.scale, self.offset_x, self.offset_y
 
-        # --- GRID ---
-        if self.grid_on.get():
-            step_img = self._nice_step(GRID_TARGET_STEP_CANVAS)
-            # verticals
-            k = 0
-            while True:
-                x_img = k * step_img
-                if x_img > iw: break
-                xc, _ = self.img_to_canvas(x_img, 0)
-                if x0 <= xc <= x1:
-                    self.canvas.create_line(xc, y0, xc, y1, fill=PALETTE["outline2"],
-                                            tags=("grid",), width=1)
-                k += 1
-            # horizontals
-            k = 0
-            while True:
-                y_img = k * step_img
-                if y_img > ih: break
-                _, yc = self.img_to_canvas(0, y_img)
-                if y0 <= yc <= y1:
-                    self.canvas.create_line(x0, yc, x1, yc, fill=PALETTE["outline2"],
-                                            tags=("grid",), width=1)
-                k += 1
+        # --- GRID --- only lines inside the viewport; at high zoom most of the image is off-canvas
+        step_img = self._nice_step(GRID_TARGET_STEP_CANVAS)
+        lines = []
+        lo, hi = max(x0, 0), min(x1, cw)
+        k = max(0, int((lo - ox) / (step_img * sc)) - 1)
+        while k * step_img <= iw:
+            xc = int(ox + k * step_img * sc)
+            if xc > hi: break
+            if xc >= lo:
+                lines.append((xc, y0, xc, y1))
+            k += 1
+        lo, hi = max(y0, 0), min(y1, ch)
+        k = max(0, int((lo - oy) / (step_img * sc)) - 1)
+        while k * step_img <= ih:
+            yc = int(oy + k * step_img * sc)
+            if yc > hi: break
+            if yc >= lo:
+                lines.append((x0, yc, x1, yc))
+            k += 1
+
+        # reuse the line items from the last frame: coords() instead of delete + create
+        items = self._grid_items
+        for item, xy in zip(items, lines):
+            self.canvas.coords(item, *xy)
+            self.canvas.itemconfig(item, state="normal")
+        for xy in lines[len(items):]:
+            items.append(self.canvas.create_line(*xy, fill=PALETTE["outline2"], tags=("grid",), width=1))
+        for item in items[len(lines):]:
+            self.canvas.itemconfig(item, state="hidden")
+
+    def _hide_grid(self):
+        for item in self._grid_items:
+            self.canvas.itemconfig(item, state="hidden")
 
     def _nice_step(self, target_canvas_px: int) -> int:
         """Return a 'nice' image-pixel step so grid lines land ~target_canvas_px apart."""
         if self.image is None or self.scale <= 0:
             return 50
+        key = (self.scale, target_canvas_px)
+        if key == self._step_key[0]:
+            return self._step_key[1]
         target_img = max(1, int(round(target_canvas_px / self.scale)))
-        # round to 1/2/5 × 10^n
-        base = 1
-        while base * 5 < target_img:
-            base *= 10
-        candidates = [base, base*2, base*5, base*10]
-        return min(candidates, key=lambda s: abs(s - target_img))
+        # round to 1/2/5 × 10^n, base = smallest power of ten with 5*base >= target
+        m = -(-target_img // 5)
+        base = 10 ** len(str(m - 1)) if m > 1 else 1
+        step = base
+        for s in (base*2, base*5, base*10):
+            if abs(s - target_img) < abs(step - target_img):
+                step = s
+        self._step_key = (key, step)
+        return step
     def _image_rect_canvas(self):
         """Canvas rect that the image occupies."""
         if self.image is None:
@@ -530,19 +917,28 @@ class LabelerApp(tk.Tk):
 
     def _build_snap_targets_canvas(self, skip_indices: set[int] | None = None):
         """Collect candidate X/Y positions (canvas px) to snap to."""
-        xs, ys = set(), set()
         x0, y0, x1, y1 = self._image_rect_canvas()
-        # image edges
-        xs.update([x0, x1]); ys.update([y0, y1])
-
-        # other visible boxes
+        sc, ox, oy = self.scale, self.offset_x, self.offset_y
+        if _NP_OK and len(self.boxes) >= SNAP_NP_MIN:
+            # one pass over the box mirror instead of per-box attribute loads
+            keep = self._visible_mask()
+            if skip_indices:
+                keep[list(skip_indices)] = False
+            rows = self.boxes_arr[keep]
+            xs = (rows[:, (0, 2)].ravel() * sc + ox).astype(np.int64)
+            ys = (rows[:, (1, 3)].ravel() * sc + oy).astype(np.int64)
+            return (np.unique(np.concatenate(((x0, x1), xs))).tolist(),
+                    np.unique(np.concatenate(((y0, y1), ys))).tolist())
+
+        xs, ys = {x0, x1}, {y0, y1}   # image edges
+        # other visible boxes (runs per drag event: hoist scale/offsets, flat visibility map)
+        vis = self._class_vis_map
         for i, b in enumerate(self.boxes):
             if skip_indices and i in skip_indices:
                 continue
-            if b.cls in self.classes and self.classes[b.cls]["show"].get():
-                bx1, by1 = self.img_to_canvas(b.x1, b.y1)
-                bx2, by2 = self.img_to_canvas(b.x2, b.y2)
-                xs.update([bx1, bx2]); ys.update([by1, by2])
+            if vis.get(b.cls, False):
+                xs.add(int(ox + b.x1*sc)); xs.add(int(ox + b.x2*sc))
+                ys.add(int(oy + b.y1*sc)); ys.add(int(oy + b.y2*sc))
         return sorted(xs), sorted(ys)
 
     def _snap_scalar(self, value: int, candidates: list[int]) -> tuple[int, bool]:
@@ -585,9 +981,10 @@ class LabelerApp(tk.Tk):
             return "break"
 
         count = 0
+        hidden, classes = self._hidden_classes(), self.classes
         for b in self.boxes:
-            visible = (b.cls in self.classes) and self.classes[b.cls]["show"].get()
-            b.selected = bool(visible)
+            visible = b.cls in classes and b.cls not in hidden
+            b.selected = visible
             if visible:
                 count += 1
 
@@ -618,10 +1015,13 @@ class LabelerApp(tk.Tk):
         return abs(aa - bb) / max(aa, bb) <= DUP_AREA_FRAC
 
     def _box_visible(self, b):
-        return (b.cls in self.classes) and self.classes[b.cls]["show"].get()
+        # _class_vis_map is rebuilt at the top of every redraw, which is the only caller
+        return self._class_vis_map.get(b.cls, False)
 
     def _find_duplicate_box_pairs(self):
         """Return list of (i, j) pairs that look like duplicates (same class)."""
+        if _NP_OK:
+            return dup_pairs(self.boxes_arr, self._visible_mask())
         pairs = []
         n = len(self.boxes)
         for i in range(n):
@@ -689,9 +1089,7 @@ class LabelerApp(tk.Tk):
         ttk.Button(btns, text="Cancel", command=_cancel).pack(side=tk.RIGHT)
 
         win.update_idletasks()
-        w, h = win.winfo_reqwidth(), win.winfo_reqheight()
-        x = self.winfo_rootx() + (self.winfo_width() - w)//2
-        y = self.winfo_rooty() + (self.winfo_height() - h)//2
+        x, y = self._centered_xy(win.winfo_reqwidth(), win.winfo_reqheight())
         win.geometry(f"+{max(0,x)}+{max(0,y)}")
 
         self._scan_progress_win = win
@@ -706,7 +1104,7 @@ class LabelerApp(tk.Tk):
         self._scan_progress_win = None
         self._scan_prog_var = None
         self._scan_msg = None
-    def _scan_all_worker(self, paths, model_path):
+    def _scan_all_worker(self, paths, model_path, batch_size=YOLO_BATCH):
         try:
             model = self._get_yolo_model(model_path)
         except Exception as ex:
@@ -722,19 +1120,28 @@ class LabelerApp(tk.Tk):
         curp = self.image_paths[self.image_idx] if (self.image_paths and 0 <= self.image_idx < len(self.image_paths)) else None
         names_map_for_current = {}
 
-        # process in batches
-        B = max(1, YOLO_BATCH)
+        # process in batches; the next batches decode on a small pool while this one predicts
+        B = max(1, int(batch_size))
+        pool = ThreadPoolExecutor(max_workers=SCAN_DECODE_WORKERS)
+        submit = lambda s0: [(p, pool.submit(self._decode_image, p)) for p in paths[s0:s0+B]]
+        pending = deque(submit(s0) for s0 in range(0, min(total, SCAN_PREFETCH_BATCHES * B), B))
         for start in range(0, total, B):
             if self._scan_cancel:
                 break
-            batch_paths = paths[start:start+B]
+            batch = pending.popleft()
+            nxt = start + SCAN_PREFETCH_BATCHES * B
+            if nxt < total:
+                pending.append(submit(nxt))
+            batch_paths = [p for p, _ in batch]
 
             try:
-                # Load a small batch of images
+                # Collect the prefetched batch
                 pil_images = []
-                for p in batch_paths:
+                for p, fut in batch:
                     try:
-                        pil_images.append(Image.open(p).convert("RGB"))
+                        im = fut.result()
+                        self._size_cache[p] = im.size   # label write needs no header probe
+                        pil_images.append(im)
                     except Exception as ex:
                         failed += 1
                         self._scan_queue.put(("warn", f"{os.path.basename(p)}: {ex}"))
@@ -748,13 +1155,15 @@ class LabelerApp(tk.Tk):
                 v_paths, v_images = zip(*valid_pairs)
 
                 # YOLO once for the batch
-                outputs = self._detect_boxes_for_batch(list(v_images), model)
+                outputs = self._detect_boxes_for_batch(list(v_images), model, batch_size=B)
 
                 # Iterate results per image
                 for p, (boxes, names_map) in zip(v_paths, outputs):
                     try:
                         snap = [(b.x1, b.y1, b.x2, b.y2, b.cls) for b in boxes]
-                        self._write_yolo_txt_for_path(p, boxes)   # file I/O in worker
+                        iw, ih = self._size_cache[p]
+                        # disk writes go to the save thread; inference moves on to the next batch
+                        self._enqueue_save(self._yolo_txt_path_for(p), self._yolo_lines(boxes, iw, ih))
                         processed += 1
                         total_boxes += len(boxes)
                         if p == curp:
@@ -769,13 +1178,18 @@ class LabelerApp(tk.Tk):
                 failed += len(batch_paths)
                 self._scan_queue.put(("warn", f"Batch {start//B+1}: {ex}"))
 
+        for queued in pending:   # cancelled mid-scan: drop decodes nobody will use
+            for _, fut in queued:
+                fut.cancel()
+        pool.shutdown(wait=False)
+        self._flush_saves()   # "done" means every label file is on disk
         self._scan_queue.put(("done", processed, total_boxes, failed, names_map_for_current))
 
 
     def _poll_scan_queue(self):
-        processed_one_image = False
+        last_image = None   # (path, count) of the newest image this tick
         try:
-            # Drain control/meta messages immediately; stop after 1 image to show 1-by-1 progress.
+            # Drain everything queued; progress widgets are updated once per tick, not per image.
             while True:
                 msg = self._scan_queue.get_nowait()
                 kind = msg[0]
@@ -788,23 +1202,19 @@ class LabelerApp(tk.Tk):
                     self._set_status(f"Scan All: 0/{total}")
 
                 elif kind == "image":
-                    # Handle exactly ONE image per tick for smooth 1/400, 2/400, ...
                     _, p, cnt, classes_set, snap = msg
                     self._scan_done += 1
-                    if self._scan_prog_var is not None:
-                        self._scan_prog_var.set(self._scan_done)
-                    if self._scan_msg is not None:
-                        self._scan_msg.set(f"{self._scan_done}/{self._scan_total}  {os.path.basename(p)} — boxes: {cnt}")
-                    self._set_status(f"Scan All: {self._scan_done}/{self._scan_total} {os.path.basename(p)}")
+                    last_image = (p, cnt)
 
                     # update in-memory annotations and project index (Tk-safe)
-                    self.annotations[p] = snap
-                    self.project_index[p] = {"boxes": cnt, "classes": classes_set}
+                    self.annotations[p] = pack_snapshot(snap)
+                    self.project_index[p] = {"boxes": cnt, "mask": class_mask(classes_set)}
                     if hasattr(self, "tree") and self.tree.exists(p):
-                        try: self.tree.item(p, values=(cnt,))
+                        try:
+                            self.tree.item(p, values=(cnt,))
+                            if p in self._tree_state:
+                                self._tree_state[p] = (self._tree_state[p][0], cnt)
                         except Exception: pass
-                    processed_one_image = True
-                    break  # <- stop here so next tick shows the next "+1"
 
                 elif kind == "warn":
                     _, txt = msg
@@ -829,7 +1239,7 @@ class LabelerApp(tk.Tk):
                             self._push_undo()
                             self._restore_from_snapshot(self.annotations[curp])
                             if names_map_for_current:
-                                cls_ids = [t[4] for t in self.annotations[curp]]
+                                cls_ids = [int(t[4]) for t in self.annotations[curp]]
                                 self._set_classes_from_detections(cls_ids, names_map_for_current)
                             self._remember_current()
                             self.redraw()
@@ -851,10 +1261,18 @@ class LabelerApp(tk.Tk):
             # swallow any weird queue edge case, keep polling
             pass
 
+        if last_image is not None:
+            p, cnt = last_image
+            if self._scan_prog_var is not None:
+                self._scan_prog_var.set(self._scan_done)
+            if self._scan_msg is not None:
+                self._scan_msg.set(f"{self._scan_done}/{self._scan_total}  {os.path.basename(p)} — boxes: {cnt}")
+            self._set_status(f"Scan All: {self._scan_done}/{self._scan_total} {os.path.basename(p)}")
+
         # keep polling
         if self._scan_all_running:
             # Faster cadence right after an image to feel snappy; otherwise a bit slower.
-            self.after(15 if processed_one_image else 50, self._poll_scan_queue)
+            self.after(15 if last_image is not None else 50, self._poll_scan_queue)
 
 
     def _luma(self, rgb):
@@ -875,16 +1293,18 @@ class LabelerApp(tk.Tk):
         b = max(0, min(255, int(b*factor)))
         return f"#{r:02x}{g:02x}{b:02x}"
 
-    def _draw_box_label(self, box, x1c: int, y1c: int):
-        """Draw a little pill with the class name above the box."""
+    def _draw_box_label(self, idx: int, box, x1c: int, y1c: int) -> bool:
+        """Place the class-name pill above box idx, reusing its canvas items from the last redraw."""
         info = self.classes.get(box.cls)
         if not info: 
-            return
+            return False
         name = str(info.get("name", f"class_{box.cls}"))
-        # Measure text
+        # Measure text (font is fixed, so widths are memoized per name)
         pad_x, pad_y = 6, 2
-        text_w = self.box_label_font.measure(name)
-        text_h = self.box_label_font.metrics("linespace")
+        text_w = self._label_widths.get(name)
+        if text_w is None:
+            text_w = self._label_widths[name] = self.box_label_font.measure(name)
+        text_h = self._label_linespace
         w = text_w + 2*pad_x
         h = text_h + 2*pad_y
 
@@ -899,30 +1319,60 @@ class LabelerApp(tk.Tk):
             cx = max(0, cw - w - 1)
 
         # Colors
-        base = info.get("color", "#3a3a3a")
-        bg = self._darken_hex(base, 0.82)
-        fg = self._best_text_color(bg)
+        _color, _rgba, bg, fg = self._class_style(box.cls)
         outline = PALETTE.get("outline2", "#46586a")
         if box.selected:
             outline = PALETTE.get("warning", "#ffd166")
 
+        ty = cy + pad_y + text_h//2
+        style = (name, bg, fg, outline)
+        entry = self._label_items.get(idx)
+        if entry is not None:
+            (bg_id, sh_id, tx_id), old = entry
+            self.canvas.coords(bg_id, cx, cy, cx + w, cy + h)
+            self.canvas.coords(sh_id, cx + pad_x + 1, ty + 1)
+            self.canvas.coords(tx_id, cx + pad_x, ty)
+            if old != style:
+                self.canvas.itemconfig(bg_id, fill=bg, outline=outline)
+                self.canvas.itemconfig(sh_id, text=name)
+                self.canvas.itemconfig(tx_id, text=name, fill=fg)
+                entry[1] = style
+            return True
+
         # Draw pill + text
-        self.canvas.create_rectangle(
+        bg_id = self.canvas.create_rectangle(
             cx, cy, cx + w, cy + h,
             fill=bg, outline=outline, width=1,
-            tags=("overlay", "labelbg")
+            tags=("boxitem", "labelbg")
         )
         # Tiny shadow for readability
-        self.canvas.create_text(
-            cx + pad_x + 1, cy + pad_y + text_h//2 + 1,
+        sh_id = self.canvas.create_text(
+            cx + pad_x + 1, ty + 1,
             text=name, anchor="w", fill="#000000",
-            font=self.box_label_font, tags=("overlay","labelshadow")
+            font=self.box_label_font, tags=("boxitem","labelshadow")
         )
-        self.canvas.create_text(
-            cx + pad_x, cy + pad_y + text_h//2,
+        tx_id = self.canvas.create_text(
+            cx + pad_x, ty,
             text=name, anchor="w", fill=fg,
-            font=self.box_label_font, tags=("overlay","label")
+            font=self.box_label_font, tags=("boxitem","label")
         )
+        self._label_items[idx] = [(bg_id, sh_id, tx_id), style]
+        return True
+
+    def _class_style(self, cid: int) -> Tuple[str, Tuple[int,int,int,int], str, str]:
+        """(color, PIL RGBA, label bg, label fg) for a class; recomputed only when its color changes."""
+        color = self._class_color_map.get(cid, "#3a3a3a")
+        st = self._class_draw_cache.get(cid)
+        if st is not None and st[0] == color:
+            return st
+        try:
+            rgba = tuple(ImageColor.getrgb(color)[:3]) + (255,)
+        except ValueError:
+            rgba = tuple(ImageColor.getrgb(PALETTE["accent"])) + (255,)
+        bg = self._darken_hex(color, 0.82)
+        st = (color, rgba, bg, self._best_text_color(bg))
+        self._class_draw_cache[cid] = st
+        return st
 
     # ---------- style ----------
     def _init_style(self):
@@ -1138,7 +1588,7 @@ class LabelerApp(tk.Tk):
                 style="Filter.TCombobox"   # <- add this
             )
         self.filter_combo.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(8,8))
-        self.filter_combo.bind("<<ComboboxSelected>>", self._wrap(lambda e: self._rebuild_project_tree()))
+        self.filter_combo.bind("<<ComboboxSelected>>", self._wrap(lambda e: self._schedule_tree_rebuild()))
         ttk.Button(frow, text="Refresh", command=self._wrap(self._refresh_project_index)).pack(side=tk.LEFT)
 
         # Tree
@@ -1188,14 +1638,17 @@ class LabelerApp(tk.Tk):
     def _highlight_current_in_tree(self):
         if not hasattr(self, "tree"):
             return
-        # clear any previous highlight
-        for iid in self.tree.get_children(""):
-            self.tree.item(iid, tags=())
+        # clear the previous highlight
+        prev = self._tree_current_iid
+        self._tree_current_iid = None
+        if prev is not None and self.tree.exists(prev):
+            self.tree.item(prev, tags=())
         if not (self.image_paths and 0 <= self.image_idx < len(self.image_paths)):
             return
         iid = self.image_paths[self.image_idx]
         if self.tree.exists(iid):
             self.tree.item(iid, tags=("current_row",))
+            self._tree_current_iid = iid
             # also show it as selected/focused & scroll into view
             try:
                 self.tree.selection_set(iid)
@@ -1246,7 +1699,7 @@ class LabelerApp(tk.Tk):
         card = ttk.Labelframe(parent, text="YOLO PREFILL", style="Card.TLabelframe", padding=10)
         card.pack(fill=tk.X, pady=6, padx=8)
 
-        self.var_prefill = tk.BooleanVar(value=bool(_YOLO_OK))
+        self.var_prefill = tk.BooleanVar(value=_yolo_installed())
         ttk.Checkbutton(card, text="Enable prefill", variable=self.var_prefill).pack(anchor="w")
 
         row = ttk.Frame(card, style="Card.TLabelframe"); row.pack(fill=tk.X, pady=(6,0))
@@ -1256,11 +1709,26 @@ class LabelerApp(tk.Tk):
         ent.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(8,8))
         ttk.Button(row, text="Browse…", command=self._wrap(self.browse_model_file)).pack(side=tk.LEFT)
 
+        row_b = ttk.Frame(card, style="Card.TLabelframe"); row_b.pack(fill=tk.X, pady=(6,0))
+        ttk.Label(row_b, text="Scan batch:", style="Muted.TLabel").pack(side=tk.LEFT)
+        self.var_batch = tk.IntVar(value=YOLO_BATCH)
+        ttk.Spinbox(row_b, from_=1, to=SCAN_MAX_BATCH, width=5, textvariable=self.var_batch).pack(side=tk.LEFT, padx=(8,0))
+        ttk.Label(row_b, text="Device:", style="Muted.TLabel").pack(side=tk.LEFT, padx=(12,0))
+        self.var_device = tk.StringVar(value="auto")
+        dev_combo = ttk.Combobox(row_b, textvariable=self.var_device, values=("auto", "cpu"),
+                                 state="readonly", width=6)
+        dev_combo.pack(side=tk.LEFT, padx=(8,0))
+        dev_combo.bind("<<ComboboxSelected>>", self._on_device_changed)
+
         row2 = ttk.Frame(card, style="Card.TLabelframe"); row2.pack(fill=tk.X, pady=(8,0))
         ttk.Button(row2, text="🔮  Prefill (once)", style="Accent.TButton",
                    command=self._wrap(self.on_prefill_once)).pack(side=tk.LEFT, fill=tk.X, expand=True)
         ttk.Button(row2, text="🧭  Scan All", command=self._wrap(self.on_scan_all)).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(8,0))
 
+        # INT8 (CPU) or TensorRT (GPU) is decided on click, so building the panel doesn't import torch
+        ttk.Button(card, text="⚡  Export optimized model",
+                   command=self._wrap(self.on_export_optimized)).pack(fill=tk.X, pady=(8,0))
+
     def _card_visibility(self, parent):
         card = ttk.Labelframe(parent, text="VISIBILITY", style="Card.TLabelframe", padding=10)
         card.pack(fill=tk.X, pady=6, padx=8)
@@ -1327,18 +1795,16 @@ class LabelerApp(tk.Tk):
             self.classes[cid] = {
                 "name": name,
                 "color": self._auto_color_for(cid),
-                "show": tk.BooleanVar(value=True)
+                "show": self._new_show_var()
             }
             existing_lower.add(name.lower())
             added += 1
     
         # Refresh UI
-        self._rebuild_visibility_ui()
-        self._rebuild_newclass_ui()
-        self.redraw()
+        self._schedule_class_ui()
     
         # Feedback
-        self._set_status(f"Imported {added} label(s)" + (f", skipped {skipped} duplicate(s)" if skipped else ""))
+        self._schedule(3, f"Imported {added} label(s)" + (f", skipped {skipped} duplicate(s)" if skipped else ""))
         try:
             messagebox.showinfo(
                 "Import labels",
@@ -1393,53 +1859,103 @@ class LabelerApp(tk.Tk):
         if cur is None:
             return
         cur_val = self.filter_var.get()
-        self.filter_combo["values"] = vals
+        if vals != self._filter_vals:   # runs on every tree rebuild; skip the Tcl configure when unchanged
+            self.filter_combo["values"] = vals
+            self._filter_vals = vals
         if cur_val not in vals:
             self.filter_var.set("All")
+    # ---------- pooled modals (built once, withdrawn between uses) ----------
+    def _pooled_modal(self, sig, build) -> Dict:
+        """Return the cached modal for sig, (re)building it if missing or destroyed."""
+        entry = self._modal_pool.get(sig)
+        if entry is not None:
+            try:
+                if not entry["dlg"].winfo_exists():
+                    entry = None
+            except tk.TclError:
+                entry = None
+        if entry is None:
+            dlg = tk.Toplevel(self)
+            dlg.withdraw()                      # avoids initial flicker
+            dlg.transient(self)
+            dlg.configure(bg=PALETTE["card"])
+            entry = {"dlg": dlg, "val": None, "done": tk.IntVar(dlg, value=0)}
+
+            def choose(val, entry=entry):
+                entry["val"] = val
+                try: entry["dlg"].grab_release()
+                except Exception: pass
+                entry["dlg"].withdraw()
+                entry["done"].set(1)
+            entry["choose"] = choose
+            dlg.protocol("WM_DELETE_WINDOW", lambda: choose(entry.get("cancel_val")))
+            dlg.bind("<Escape>", lambda e: choose(entry.get("cancel_val")))
+            build(entry)
+            self._modal_pool[sig] = entry
+        return entry
+
+    def _on_root_configure(self, e):
+        # root bindings also fire for every child widget; only the toplevel itself matters here
+        if e.widget is self:
+            self._root_geom = (self.winfo_rootx(), self.winfo_rooty(), e.width, e.height)
+        elif e.widget is getattr(self, "canvas", None):
+            self._canvas_wh = (int(e.width), int(e.height))
+
+    def _centered_xy(self, w: int, h: int) -> Tuple[int, int]:
+        """Top-left for a w x h window centered on the root, from cached geometry (no idle flush)."""
+        if self._root_geom is not None:
+            rx, ry, rw, rh = self._root_geom
+        else:
+            rx, ry, rw, rh = self.winfo_rootx(), self.winfo_rooty(), self.winfo_width(), self.winfo_height()
+        return rx + (rw - w)//2, ry + (rh - h)//2
+
+    def _run_modal(self, entry, w: int, h: int, focus=None):
+        """Center, show, grab and block until the pooled modal is answered."""
+        dlg = entry["dlg"]
+        entry["val"] = entry.get("cancel_val")
+        entry["done"].set(0)
+        x, y = self._centered_xy(w, h)
+        dlg.geometry(f"{w}x{h}+{max(0, x)}+{max(0, y)}")
+        dlg.deiconify()
+        dlg.lift()
+        try:
+            dlg.grab_set()
+        except tk.TclError:
+            pass
+        if focus is not None:
+            focus.focus_set()
+        try:
+            dlg.wait_variable(entry["done"])
+        except tk.TclError:
+            pass   # window destroyed under us
+        return entry["val"]
+
     def _ask_save_on_close(self) -> str:
         """
         Returns one of: 'save', 'dont', 'cancel'
         """
-        dlg = tk.Toplevel(self)
-        dlg.title("Unsaved changes")
-        dlg.configure(bg=PALETTE["card"])
-        dlg.transient(self)
-        dlg.grab_set()
-
-        # center dialog over parent
-        self.update_idletasks()
-        px = self.winfo_rootx()
-        py = self.winfo_rooty()
-        pw = self.winfo_width()
-        ph = self.winfo_height()
-        dlg.update_idletasks()
-        w, h = 360, 140
-        x = px + (pw - w)//2
-        y = py + (ph - h)//2
-        dlg.geometry(f"{w}x{h}+{x}+{y}")
-
-        # content
-        frm = ttk.Frame(dlg, padding=16, style="Card.TLabelframe")
-        frm.pack(fill=tk.BOTH, expand=True)
-        ttk.Label(frm, text="Save changes before closing?", style="White.TLabel").pack(anchor="w")
+        def build(entry):
+            dlg = entry["dlg"]
+            entry["cancel_val"] = "cancel"   # default if the window is closed
+            dlg.title("Unsaved changes")
 
-        choice = {"val": "cancel"}  # default if the window is closed
+            # content
+            frm = ttk.Frame(dlg, padding=16, style="Card.TLabelframe")
+            frm.pack(fill=tk.BOTH, expand=True)
+            ttk.Label(frm, text="Save changes before closing?", style="White.TLabel").pack(anchor="w")
 
-        btns = ttk.Frame(frm, style="Card.TLabelframe")
-        btns.pack(side=tk.BOTTOM, anchor="e", pady=(16,0))
+            btns = ttk.Frame(frm, style="Card.TLabelframe")
+            btns.pack(side=tk.BOTTOM, anchor="e", pady=(16,0))
 
-        def _set(v):
-            choice["val"] = v
-            dlg.destroy()
+            _set = entry["choose"]
+            ttk.Button(btns, text="Save",       command=lambda: _set("save"),
+                       style="Accent.TButton").pack(side=tk.RIGHT, padx=(8,0))
+            ttk.Button(btns, text="Don’t Save", command=lambda: _set("dont")).pack(side=tk.RIGHT, padx=(8,0))
+            ttk.Button(btns, text="Cancel",     command=lambda: _set("cancel")).pack(side=tk.RIGHT)
 
-        ttk.Button(btns, text="Save",       command=lambda: _set("save"),
-                   style="Accent.TButton").pack(side=tk.RIGHT, padx=(8,0))
-        ttk.Button(btns, text="Don’t Save", command=lambda: _set("dont")).pack(side=tk.RIGHT, padx=(8,0))
-        ttk.Button(btns, text="Cancel",     command=lambda: _set("cancel")).pack(side=tk.RIGHT)
+        entry = self._pooled_modal("save_on_close", build)
+        return self._run_modal(entry, 360, 140)
 
-        dlg.protocol("WM_DELETE_WINDOW", lambda: _set("cancel"))
-        dlg.wait_window()
-        return choice["val"]
     def _modal_choice(self, title: str, message: str, buttons, width: int = 480):
         """
         Reusable modal with right-aligned buttons.
@@ -1447,63 +1963,56 @@ class LabelerApp(tk.Tk):
                  The FIRST item is treated as the primary (Enter).
         Returns chosen return_value (or None on cancel/close).
         """
-        dlg = tk.Toplevel(self)
-        dlg.withdraw()                      # avoids initial flicker
-        dlg.title(title)
-        dlg.transient(self)
-        dlg.configure(bg=PALETTE["card"])
-        dlg.resizable(False, False)
-
-        result = {"val": None}
-        def choose(val):
-            result["val"] = val
-            try: dlg.grab_release()
-            except Exception: pass
-            dlg.destroy()
-
-        dlg.protocol("WM_DELETE_WINDOW", lambda: choose(None))
-        dlg.bind("<Escape>", lambda e: choose(None))
-
-        # ---- layout ------------------------------------------------------------
-        outer = ttk.Frame(dlg, style="Dialog.TFrame", padding=14)
-        outer.pack(fill=tk.BOTH, expand=True)
+        def build(entry):
+            dlg = entry["dlg"]
+            dlg.resizable(False, False)
 
-        top = ttk.Frame(outer, style="Dialog.TFrame")
-        top.pack(fill=tk.X)
+            # ---- layout --------------------------------------------------------
+            outer = ttk.Frame(dlg, style="Dialog.TFrame", padding=14)
+            outer.pack(fill=tk.BOTH, expand=True)
 
-        # icon + text
-        ttk.Label(top, text="⚠️", style="DialogHeading.TLabel").pack(side=tk.LEFT, padx=(2, 10))
-        text_box = ttk.Frame(top, style="Dialog.TFrame"); text_box.pack(side=tk.LEFT, fill=tk.X, expand=True)
-        ttk.Label(text_box, text=title, style="DialogHeading.TLabel").pack(anchor="w")
-        ttk.Label(text_box, text=message, style="DialogText.TLabel",
-                  wraplength=width-120, justify="left").pack(anchor="w", pady=(4, 0))
-
-        # buttons (right-aligned with a spacer column)
-        btn_row = ttk.Frame(outer, style="Dialog.TFrame"); btn_row.pack(fill=tk.X, pady=(12, 0))
-        btn_row.grid_columnconfigure(0, weight=1)
-
-        primary_btn = None
-        for i, (text, style_name, ret) in enumerate(buttons, start=1):
-            b = ttk.Button(btn_row, text=text, style=style_name, command=lambda v=ret: choose(v))
-            b.grid(row=0, column=i, padx=(8 if i > 1 else 0, 0))
-            if primary_btn is None:
-                primary_btn = b
-
-        dlg.bind("<Return>", lambda e: primary_btn.invoke())
+            top = ttk.Frame(outer, style="Dialog.TFrame")
+            top.pack(fill=tk.X)
+
+            # icon + text
+            ttk.Label(top, text="⚠️", style="DialogHeading.TLabel").pack(side=tk.LEFT, padx=(2, 10))
+            text_box = ttk.Frame(top, style="Dialog.TFrame"); text_box.pack(side=tk.LEFT, fill=tk.X, expand=True)
+            entry["heading"] = ttk.Label(text_box, style="DialogHeading.TLabel")
+            entry["heading"].pack(anchor="w")
+            entry["message"] = ttk.Label(text_box, style="DialogText.TLabel",
+                                         wraplength=width-120, justify="left")
+            entry["message"].pack(anchor="w", pady=(4, 0))
+
+            # buttons (right-aligned with a spacer column)
+            btn_row = ttk.Frame(outer, style="Dialog.TFrame"); btn_row.pack(fill=tk.X, pady=(12, 0))
+            btn_row.grid_columnconfigure(0, weight=1)
+
+            entry["buttons"] = []
+            for i, (text, style_name, _ret) in enumerate(buttons, start=1):
+                b = ttk.Button(btn_row, text=text, style=style_name)
+                b.grid(row=0, column=i, padx=(8 if i > 1 else 0, 0))
+                entry["buttons"].append(b)
+            entry["outer"] = outer
+            primary = entry["buttons"][0]
+            dlg.bind("<Return>", lambda e: primary.invoke())
+
+        sig = ("choice", width) + tuple((t, st) for t, st, _ in buttons)
+        entry = self._pooled_modal(sig, build)
+        dlg = entry["dlg"]
+
+        # rewire text + return values only
+        dlg.title(title)
+        entry["heading"].configure(text=title)
+        entry["message"].configure(text=message)
+        for b, (_t, _st, ret) in zip(entry["buttons"], buttons):
+            b.configure(command=lambda v=ret: entry["choose"](v))
 
         # ---- show centered & modal --------------------------------------------
         dlg.update_idletasks()
-        dlg.deiconify()
+        outer = entry["outer"]
         w = max(width, outer.winfo_reqwidth() + 28)
         h = outer.winfo_reqheight() + 28
-        x = self.winfo_rootx() + (self.winfo_width() - w)//2
-        y = self.winfo_rooty() + (self.winfo_height() - h)//2
-        dlg.geometry(f"{w}x{h}+{max(0, x)}+{max(0, y)}")
-
-        dlg.grab_set()
-        primary_btn.focus_set()
-        dlg.wait_window()
-        return result["val"]
+        return self._run_modal(entry, w, h, focus=entry["buttons"][0])
 
     
     def _refresh_project_index(self):
@@ -1513,34 +2022,115 @@ class LabelerApp(tk.Tk):
         self._highlight_current_in_tree()
 
 
+    def _index_cache_path(self) -> str:
+        return os.path.join(OUTPUT_LBL_DIR, INDEX_CACHE_FILE)
+
+    def _load_index_cache(self) -> Dict[str, Dict]:
+        try:
+            with open(self._index_cache_path(), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except Exception:
+            return {}
+
+    def _save_index_cache(self, cache: Dict[str, Dict]):
+        try:
+            with open(self._index_cache_path(), "w", encoding="utf-8") as f:
+                json.dump(cache, f)
+        except Exception as ex:
+            log_exc("_save_index_cache", ex)
+
+    @staticmethod
+    def _count_yolo_txt(txt_path: str) -> Tuple[int, Set[int]]:
+        """Box count and class ids of a label file; no image size needed, so no Image.open."""
+        with open(txt_path, "r", encoding="utf-8") as f:
+            text = f.read()
+        if _NP_OK:
+            a = yolo_rows_array(text)
+            ok = (a[:, 3] > 0) & (a[:, 4] > 0)
+            return int(np.count_nonzero(ok)), set(a[ok, 0].astype(np.int64).tolist())
+        rows = yolo_rows(text)
+        count = 0
+        classes_set: Set[int] = set()
+        for k in range(0, len(rows), 5):
+            if rows[k + 3] <= 0 or rows[k + 4] <= 0: continue
+            classes_set.add(int(rows[k]))
+            count += 1
+        return count, classes_set
+
     def _rebuild_project_index(self):
         self.project_index.clear()
+        if self._index_cache is None:
+            self._index_cache = self._load_index_cache()
+        cache = self._index_cache
+        cache_changed = False
+        disk_paths = []
         for p in self.image_paths:
             boxes_count = 0
-            classes_set: Set[int] = set()
+            mask = 0
             if p in self.annotations:
                 snap = self.annotations[p]
                 boxes_count = len(snap)
-                for *_coords, cls in snap:
-                    classes_set.add(int(cls))
+                if boxes_count:
+                    mask = class_mask(np.unique(snap[:, 4]).tolist() if hasattr(snap, "shape")
+                                      else (t[4] for t in snap))
             else:
-                try:
-                    txt = self._yolo_txt_path_for(p)
-                    if os.path.exists(txt):
-                        iw, ih = Image.open(p).size
-                        snap = self._read_yolo_txt_for_path(p, (iw, ih))
-                        boxes_count = len(snap)
-                        for *_c, cls in snap:
-                            classes_set.add(int(cls))
-                except Exception as ex:
-                    log_exc("_rebuild_project_index", ex)
-            self.project_index[p] = {"boxes": boxes_count, "classes": classes_set}
+                disk_paths.append(p)
+            self.project_index[p] = {"boxes": boxes_count, "mask": mask}
+
+        # stat/read label files concurrently; the GIL is released while waiting on disk
+        probe = lambda p: self._probe_index_entry(p, cache.get(p))
+        if len(disk_paths) >= INDEX_IO_MIN_PATHS:
+            with ThreadPoolExecutor(max_workers=INDEX_IO_WORKERS) as ex:
+                results = list(ex.map(probe, disk_paths))
+        else:
+            results = [probe(p) for p in disk_paths]
+        for p, (boxes_count, mask, new_ent) in zip(disk_paths, results):
+            self.project_index[p] = {"boxes": boxes_count, "mask": mask}
+            if new_ent is not None:
+                cache[p] = new_ent
+                cache_changed = True
+        if cache_changed:
+            self._save_index_cache(cache)
+
+    def _probe_index_entry(self, p: str, ent: Optional[Dict]) -> Tuple[int, int, Optional[Dict]]:
+        """(boxes, class mask, fresh cache entry or None) for one image; safe to run off the Tk thread."""
+        try:
+            txt = self._yolo_txt_path_for(p)
+            if not os.path.exists(txt):
+                return 0, 0, None
+            img_mtime = os.stat(p).st_mtime
+            txt_mtime = os.stat(txt).st_mtime
+            if ent and ent.get("img_mtime") == img_mtime and ent.get("txt_mtime") == txt_mtime:
+                mask = int(ent["mask"]) if "mask" in ent else class_mask(ent.get("classes", []))
+                return int(ent.get("boxes", 0)), mask, None
+            boxes_count, classes_set = self._count_yolo_txt(txt)
+            mask = class_mask(classes_set)
+            return boxes_count, mask, {"img_mtime": img_mtime, "txt_mtime": txt_mtime,
+                                       "boxes": boxes_count, "mask": mask}
+        except Exception as ex:
+            log_exc("_rebuild_project_index", ex)
+            return 0, 0, None
+
+    def classes_of(self, p: str) -> Set[int]:
+        """Class ids present in an image's labels, decoded from the index bitmask."""
+        info = self.project_index.get(p)
+        return mask_classes(info["mask"]) if info else set()
+
+    def _schedule_tree_rebuild(self, delay_ms: int = 150):
+        """Debounced _rebuild_project_tree: bursts of edits/filter changes rebuild once."""
+        if self._tree_rebuild_after is not None:
+            try: self.after_cancel(self._tree_rebuild_after)
+            except Exception: pass
+        self._tree_rebuild_after = self.after(delay_ms, self._wrap(self._rebuild_project_tree))
 
     def _rebuild_project_tree(self):
         if not hasattr(self, "tree"):
             return
-        for i in self.tree.get_children():
-            self.tree.delete(i)
+        if self._tree_rebuild_after is not None:
+            try: self.after_cancel(self._tree_rebuild_after)
+            except Exception: pass
+            self._tree_rebuild_after = None
         # Rebuild filter with latest classes
         self._update_filter_with_classes()
 
@@ -1555,20 +2145,33 @@ class LabelerApp(tk.Tk):
 
         filtered = []
         for p in self.image_paths:
-            info = self.project_index.get(p, {"boxes": 0, "classes": set()})
-            b = int(info.get("boxes", 0))
-            cset = set(info.get("classes", set()))
+            info = self.project_index.get(p)
+            b = int(info["boxes"]) if info else 0
             if flt == "Labeled" and b == 0:
                 continue
             if flt == "Unlabeled" and b > 0:
                 continue
-            if match_cid is not None and match_cid not in cset:
+            if match_cid is not None and (match_cid < 0 or not (info and (info["mask"] >> match_cid) & 1)):
                 continue
             filtered.append((p, b))
 
-        for i, (p, b) in enumerate(filtered, start=1):
-            base = os.path.basename(p)
-            self.tree.insert("", "end", iid=p, text=f"{i}. {base}", values=(b,))
+        # diff against what the tree already shows; only changed rows cost a Tcl call
+        desired = {p: (f"{i}. {os.path.basename(p)}", b) for i, (p, b) in enumerate(filtered, start=1)}
+        # raw Tcl calls skip ttk's per-call option normalization; iids are our own paths
+        # and values are plain ints, so the validation we bypass never fires here
+        tkw, tkcall = self.tree._w, self.tree.tk.call
+        stale = [p for p in self._tree_state if p not in desired]
+        if stale:
+            tkcall(tkw, "delete", tuple(stale))
+            for p in stale:
+                del self._tree_state[p]
+        for i, (p, row) in enumerate(desired.items()):
+            old_row = self._tree_state.get(p)
+            if old_row is None:
+                tkcall(tkw, "insert", "", i, "-id", p, "-text", row[0], "-values", (row[1],))
+            elif old_row != row:
+                tkcall(tkw, "item", p, "-text", row[0], "-values", (row[1],))
+            self._tree_state[p] = row
 
         self._highlight_current_in_tree()
 
@@ -1588,44 +2191,71 @@ class LabelerApp(tk.Tk):
         self._on_tree_double_click()
 
     # ---------- dynamic class UI rebuild ----------
+    def _sync_class_widgets(self, container, cache: Dict, make, placeholder: str):
+        """Diff per-class widgets against self.classes: create/destroy only the delta, relabel on rename."""
+        want = set(self.classes)
+        changed = False
+        for cid in set(cache) - want:
+            cache.pop(cid)["w"].destroy()
+            changed = True
+        for cid in want - set(cache):
+            cache[cid] = {"w": make(cid), "text": None}
+            changed = True
+        for cid in want:
+            ent = cache[cid]
+            text = f"{self.classes[cid]['name']} ({cid})"
+            if ent["text"] != text:
+                ent["w"].configure(text=text)
+                ent["text"] = text
+        ph = self._class_placeholders.get(container)
+        if ph is None:
+            ph = ttk.Label(container, text=placeholder, style="Muted.TLabel")
+            self._class_placeholders[container] = ph
+        if changed or not want:
+            for ent in cache.values():
+                ent["w"].pack_forget()
+            ph.pack_forget()
+            if not want:
+                ph.pack(anchor="w")
+            for cid in sorted(want):
+                cache[cid]["w"].pack(anchor="w")
+
     def _rebuild_visibility_ui(self):
-        if hasattr(self, "visibility_container"):
-            for w in self.visibility_container.winfo_children():
-                w.destroy()
-        if not self.classes and hasattr(self, "visibility_container"):
-            ttk.Label(self.visibility_container, text="No labels yet.", style="Muted.TLabel").pack(anchor="w")
+        if not hasattr(self, "visibility_container"):
             return
-        if hasattr(self, "visibility_container"):
-            for cid in sorted(self.classes):
-                info = self.classes[cid]
-                var = info.get("show") or tk.BooleanVar(value=True)
-                info["show"] = var
-                text = f"{info['name']} ({cid})"
-                ttk.Checkbutton(self.visibility_container, text=text, variable=var,
-                                command=self._wrap(self.redraw)).pack(anchor="w")
+        def make(cid):
+            return ttk.Checkbutton(self.visibility_container, command=self._wrap(self.redraw))
+        for info in self.classes.values():
+            if not info.get("show"):
+                info["show"] = self._new_show_var()
+        self._sync_class_widgets(self.visibility_container, self._vis_widgets, make, "No labels yet.")
+        for cid, ent in self._vis_widgets.items():
+            var = self.classes[cid]["show"]
+            if ent.get("var") is not var:   # undo/redo hands us fresh BooleanVars
+                ent["w"].configure(variable=var)
+                ent["var"] = var
 
     def _rebuild_newclass_ui(self):
         if hasattr(self, "newclass_container"):
-            for w in self.newclass_container.winfo_children():
-                w.destroy()
-        if not self.classes and hasattr(self, "newclass_container"):
-            ttk.Label(self.newclass_container, text="No labels. Add one or run YOLO Prefill.", style="Muted.TLabel").pack(anchor="w")
+            def make(cid):
+                return ttk.Radiobutton(self.newclass_container, variable=self.var_new_cls, value=cid)
+            self._sync_class_widgets(self.newclass_container, self._newclass_widgets, make,
+                                     "No labels. Add one or run YOLO Prefill.")
+        if not self.classes:
             self.var_new_cls.set(0)
             self._rebuild_context_menu()
             self._update_filter_with_classes()
             return
-        if hasattr(self, "newclass_container"):
-            for cid in sorted(self.classes):
-                info = self.classes[cid]
-                text = f"{info['name']} ({cid})"
-                ttk.Radiobutton(self.newclass_container, text=text, variable=self.var_new_cls, value=cid).pack(anchor="w")
-        if self.classes:
-            if self.var_new_cls.get() not in self.classes:
-                self.var_new_cls.set(sorted(self.classes)[0])
+        if self.var_new_cls.get() not in self.classes:
+            self.var_new_cls.set(min(self.classes))
         self._rebuild_context_menu()
         self._update_filter_with_classes()
 
     def _rebuild_context_menu(self):
+        key = tuple((cid, self.classes[cid]["name"]) for cid in sorted(self.classes))
+        if self.ctx is not None and key == self._ctx_key:
+            return
+        self._ctx_key = key
         if self.ctx is None:
             self.ctx = tk.Menu(self, tearoff=0, bg=PALETTE["card"], fg=PALETTE["fg"],
                                activebackground=PALETTE["hover"], activeforeground=PALETTE["fg"],
@@ -1641,17 +2271,42 @@ class LabelerApp(tk.Tk):
 
     # ---------- class add/remove/manager helpers ----------
     def _next_free_id(self) -> int:
-        cid = 0
-        used = set(self.classes.keys())
-        while cid in used: cid += 1
+        # every id below the watermark is either in use or sitting in the _free_ids heap
+        while self._free_ids:
+            cid = heapq.heappop(self._free_ids)
+            if cid not in self.classes:
+                return cid
+        while self._id_watermark in self.classes:
+            self._id_watermark += 1
+        cid = self._id_watermark
+        self._id_watermark += 1
         return cid
 
-    def _auto_color_for(self, cid: int) -> str:
+    def _reset_class_ids(self):
+        """Re-derive the free-id heap after self.classes was replaced wholesale."""
+        top = max(self.classes) + 1 if self.classes else 0
+        self._free_ids = [c for c in range(top) if c not in self.classes]   # ascending -> valid heap
+        self._id_watermark = top
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _auto_color_for(cid: int) -> str:
         if cid == YOLO_UNLOCKED_ID: return PALETTE["canvasbg"]   # per your change
         if cid == YOLO_LOCKED_ID:   return PALETTE["danger"]
         idx = (cid - 2) % len(EXTRA_COLORS)
         return EXTRA_COLORS[idx]
 
+    def _refresh_class_maps(self):
+        """Flatten class color/visibility once per redraw so per-box code skips nested dicts and Tcl var reads."""
+        self._class_color_map = {cid: info.get("color", "#3a3a3a") for cid, info in self.classes.items()}
+        hidden = self._hidden_classes()
+        self._class_vis_map = {cid: cid not in hidden for cid in self.classes}
+
+    def _schedule_class_ui(self):
+        self._schedule(1, self._rebuild_visibility_ui)
+        self._schedule(1, self._rebuild_newclass_ui)
+        self._schedule(2, True)
+
     def _add_label_dialog(self):
         name = simpledialog.askstring("Add Label", "Class name:", parent=self)
         if not name: return
@@ -1660,13 +2315,11 @@ class LabelerApp(tk.Tk):
             return
         self._push_undo()
         cid = self._next_free_id()
-        self.classes[cid] = {"name": name, "color": self._auto_color_for(cid), "show": tk.BooleanVar(value=True)}
+        self.classes[cid] = {"name": name, "color": self._auto_color_for(cid), "show": self._new_show_var()}
         if not self.classes or self.var_new_cls.get() not in self.classes:
             self.var_new_cls.set(cid)
-        self._rebuild_visibility_ui()
-        self._rebuild_newclass_ui()
-        self.redraw()
-        self._set_status(f'Added label "{name}" as id {cid}.')
+        self._schedule_class_ui()
+        self._schedule(3, f'Added label "{name}" as id {cid}.')
 
     def _remove_label_dialog(self):
         if not self.classes:
@@ -1686,7 +2339,7 @@ class LabelerApp(tk.Tk):
         if rid not in self.classes:
             messagebox.showerror("Not found", f"Class id {rid} does not exist.")
             return
-        count = sum(1 for b in self.boxes if b.cls == rid)
+        count = self._cls_hist.get(rid, 0)
         if count > 0:
             if not messagebox.askyesno("Class in use",
                                        f'This class "{self.classes[rid]["name"]}" (id {rid}) has {count} boxes.\n'
@@ -1695,14 +2348,15 @@ class LabelerApp(tk.Tk):
         self._push_undo()
         if count > 0:
             self.boxes = [b for b in self.boxes if b.cls != rid]
+            self._cls_hist.pop(rid, None)
             self._remember_current()
         del self.classes[rid]
+        self._hidden_cache = None
+        heapq.heappush(self._free_ids, rid)
         if self.classes and self.var_new_cls.get() not in self.classes:
-            self.var_new_cls.set(sorted(self.classes)[0])
-        self._rebuild_visibility_ui()
-        self._rebuild_newclass_ui()
-        self.redraw()
-        self._set_status(f"Removed class id {rid}.")
+            self.var_new_cls.set(min(self.classes))
+        self._schedule_class_ui()
+        self._schedule(3, f"Removed class id {rid}.")
 
     # --- Class Manager Pro dialogs ---
     def _rename_label_dialog(self):
@@ -1729,10 +2383,8 @@ class LabelerApp(tk.Tk):
             return
         self._push_undo()
         self.classes[cid]["name"] = new_name
-        self._rebuild_visibility_ui()
-        self._rebuild_newclass_ui()
-        self.redraw()
-        self._set_status(f'Renamed class {cid} to "{new_name}".')
+        self._schedule_class_ui()
+        self._schedule(3, f'Renamed class {cid} to "{new_name}".')
 
     def _color_label_dialog(self):
         if not self.classes:
@@ -1755,8 +2407,8 @@ class LabelerApp(tk.Tk):
         if hexcolor:
             self._push_undo()
             self.classes[cid]["color"] = hexcolor
-            self.redraw()
-            self._set_status(f"Color set for class {cid}: {hexcolor}")
+            self._schedule(2, True)
+            self._schedule(3, f"Color set for class {cid}: {hexcolor}")
 
     def _merge_labels_dialog(self):
         if len(self.classes) < 2:
@@ -1787,14 +2439,43 @@ class LabelerApp(tk.Tk):
         for b in self.boxes:
             if b.cls == src:
                 b.cls = dst
+        self._cls_hist[dst] += self._cls_hist.pop(src, 0)
         del self.classes[src]
+        self._hidden_cache = None
+        heapq.heappush(self._free_ids, src)
         if self.var_new_cls.get() not in self.classes and self.classes:
-            self.var_new_cls.set(sorted(self.classes)[0])
+            self.var_new_cls.set(min(self.classes))
         self._remember_current()
-        self._rebuild_visibility_ui()
-        self._rebuild_newclass_ui()
-        self.redraw()
-        self._set_status(f"Merged class {src} into {dst}.")
+        self._schedule_class_ui()
+        self._schedule(3, f"Merged class {src} into {dst}.")
+
+    # ---------- batched UI updates ----------
+    def _schedule(self, level: int, item):
+        """Queue work for one idle flush: levels 0/1 take callables (deduped), 2 a redraw flag, 3 status text."""
+        if level == 2:
+            self._pending[2] = self._pending[2] or bool(item)
+            if item:
+                self._sync_arr()   # keep hit-testing current until the deferred redraw
+        elif level == 3:
+            self._pending[3] = item
+        elif item not in self._pending[level]:
+            self._pending[level].append(item)
+        if not self._batch_scheduled:
+            self._batch_scheduled = True
+            self.after_idle(self._flush_batch)
+
+    def _flush_batch(self):
+        self._batch_scheduled = False
+        pending, self._pending = self._pending, {0: [], 1: [], 2: False, 3: None}
+        try:
+            for fn in pending[0] + pending[1]:
+                fn()
+            if pending[2]:
+                self.redraw()
+            if pending[3] is not None:
+                self._set_status(pending[3])
+        except Exception as ex:
+            log_exc("_flush_batch", ex)
 
     # ---------- status helpers ----------
     def _short_status(self, s: str, limit: int = STATUS_MAX_CHARS) -> str:
@@ -1830,8 +2511,13 @@ class LabelerApp(tk.Tk):
         )
         if not paths: return
         self.image_paths = list(paths)
+        self._yolo_txt_cache = {}
+        self._size_cache = {}
         self.image_idx = 0
         self._history_reset()
+        # new list (possibly reordered): start the tree diff from empty
+        self.tree.delete(*self.tree.get_children())
+        self._tree_state.clear()
         self._rebuild_project_index()
         self._rebuild_project_tree()
         self._load_current_image()
@@ -1840,49 +2526,61 @@ class LabelerApp(tk.Tk):
 
 
     def prev_image(self):
+        self._nav_step(-1)
+
+    def next_image(self):
+        self._nav_step(+1)
+
+    def _nav_step(self, delta: int):
+        """Accumulate arrow-key steps; only the final index of a burst is decoded (see _flush_nav)."""
         if not self.image_paths: return
-        if self.image_idx <= 0:
+        target = self.image_idx + self._pending_nav_delta + delta
+        if target < 0:
             self._set_status("Start of list.")
             try: messagebox.showinfo("Info", "You are at the first image.")
             except Exception: pass
             return
-        self._autosave_current(silent=True)
-        self.image_idx -= 1
-        self._history_reset()
-        self._load_current_image()
-        self._load_current_image()
-        self._highlight_current_in_tree()
-
-
-    def next_image(self):
-        if not self.image_paths: return
-        if self.image_idx >= len(self.image_paths) - 1:
+        if target > len(self.image_paths) - 1:
             self._set_status("Reached end of list.")
             try: messagebox.showinfo("Info", "You are at the last image.")
             except Exception: pass
             return
-        self._autosave_current(silent=True)
-        self.image_idx += 1
+        self._pending_nav_delta += delta
+        if not self._nav_scheduled:
+            self._nav_scheduled = True
+            self.after_idle(self._flush_nav)
+
+    def _flush_nav(self):
+        self._nav_scheduled = False
+        delta, self._pending_nav_delta = self._pending_nav_delta, 0
+        if not delta or not self.image_paths: return
+        self._autosave_current(silent=True)   # only the image we are leaving; skipped ones were never edited
+        self.image_idx = max(0, min(len(self.image_paths) - 1, self.image_idx + delta))
         self._history_reset()
         self._load_current_image()
-        self._load_current_image()
         self._highlight_current_in_tree()
 
-
     def _load_current_image(self):
+        self._pending_nav_delta = 0   # a direct jump supersedes queued arrow steps
         self.boxes.clear()
+        self._cls_hist.clear()
         self._yolo_prefilled = False
         self._prefill_running = False
+        self._prefill_seq += 1   # drop any in-flight prefill result for the previous image
         self._scan_all_running = False
         self.resizing = False; self.moving = False
 
         p = self.image_paths[self.image_idx]
         try:
-            self.image = Image.open(p).convert("RGB")
+            im = self._lru_get(p)
+            self.image = im if im is not None else self._decode_image(p)
+            self._size_cache[p] = self.image.size
         except Exception as ex:
             log_exc("open_image", ex)
             messagebox.showerror("Open image failed", f"{p}\n{ex}")
             return
+        self._lru_put(p, self.image)
+        self._prefetch_neighbors()
 
         # Reset zoom to fit
         self.zoom = 1.0
@@ -1900,7 +2598,7 @@ class LabelerApp(tk.Tk):
                         if cls not in self.classes:
                             self.classes[cls] = {"name": f"class_{cls}",
                                                  "color": self._auto_color_for(cls),
-                                                 "show": tk.BooleanVar(value=True)}
+                                                 "show": self._new_show_var()}
                     self._rebuild_visibility_ui()
                     self._rebuild_newclass_ui()
                     self._restore_from_snapshot(snap); restored = True
@@ -1919,6 +2617,47 @@ class LabelerApp(tk.Tk):
         self._highlight_current_in_tree()
 
 
+    # ---------- image prefetch ----------
+    @staticmethod
+    def _decode_image(path: str) -> Image.Image:
+        im = Image.open(path).convert("RGB")
+        im.load()
+        return im
+
+    def _lru_get(self, path: str) -> Optional[Image.Image]:
+        with self._image_lru_lock:
+            im = self._image_lru.get(path)
+            if im is not None:
+                self._image_lru.move_to_end(path)
+            return im
+
+    def _lru_put(self, path: str, im: Image.Image):
+        with self._image_lru_lock:
+            self._image_lru[path] = im
+            self._image_lru.move_to_end(path)
+            while len(self._image_lru) > IMAGE_LRU_SIZE:
+                self._image_lru.popitem(last=False)
+
+    def _prefetch_neighbors(self):
+        if self._prefetch_thread is None or not self._prefetch_thread.is_alive():
+            self._prefetch_thread = threading.Thread(target=self._prefetch_worker, daemon=True)
+            self._prefetch_thread.start()
+        for i in (self.image_idx + 1, self.image_idx - 1):
+            if 0 <= i < len(self.image_paths):
+                self._prefetch_queue.put(self.image_paths[i])
+
+    def _prefetch_worker(self):
+        while True:
+            p = self._prefetch_queue.get()
+            if p is None:
+                return
+            if self._lru_get(p) is not None:
+                continue
+            try:
+                self._lru_put(p, self._decode_image(p))
+            except Exception as ex:
+                log_exc("_prefetch_worker", ex)
+
     def on_close(self):
         # Only prompt if there are unsaved changes for the current image
         if getattr(self, "dirty", False):
@@ -1931,6 +2670,7 @@ class LabelerApp(tk.Tk):
                     # If save failed and user didn’t cancel, keep the app open
                     return
             # 'dont' falls through and closes without saving
+        self._flush_saves()
         self.destroy()
 
 
@@ -1939,67 +2679,106 @@ class LabelerApp(tk.Tk):
         return [(b.x1, b.y1, b.x2, b.y2, b.cls) for b in self.boxes]
     def _remember_current(self):
         if not self.image_paths or self.image_idx < 0: return
-        self.annotations[self.image_paths[self.image_idx]] = self._snapshot()
+        self.annotations[self.image_paths[self.image_idx]] = pack_snapshot(self._snapshot())
         self._update_project_index_for_current()  # keep navigator updated
         self.dirty = True
 
     def _restore_from_snapshot(self, snap: List[Tuple[int,int,int,int,int]]):
         self.boxes = []
-        for t in snap:
+        # packed snapshots -> plain ints; every snapshot source stores sorted coords
+        rows = snap.tolist() if hasattr(snap, "tolist") else snap
+        for t in rows:
             try:
                 x1,y1,x2,y2,cls = t
-                self.boxes.append(Box(x1,y1,x2,y2,cls,selected=False))
+                self.boxes.append(Box.from_sorted(x1,y1,x2,y2,cls))
             except Exception as ex:
                 log_exc("_restore_from_snapshot", ex)
+        self._rebuild_cls_hist()
+
+    def _rebuild_cls_hist(self):
+        self._cls_hist = Counter(b.cls for b in self.boxes)
 
     def _yolo_txt_path_for(self, img_path:str) -> str:
-        base = os.path.splitext(os.path.basename(img_path))[0]
-        return os.path.join(OUTPUT_LBL_DIR, base + ".txt")
+        txt = self._yolo_txt_cache.get(img_path)
+        if txt is None:
+            base = os.path.splitext(os.path.basename(img_path))[0]
+            txt = self._yolo_txt_cache[img_path] = os.path.join(OUTPUT_LBL_DIR, base + ".txt")
+        return txt
 
     def _write_yolo_txt_for_path(self, img_path: str, boxes: List[Box]):
         if not img_path: return
         try:
-            im = self.image if (self.image_paths and self.image_paths[self.image_idx] == img_path) else Image.open(img_path).convert("RGB")
+            if self.image is not None and self.image_paths and self.image_paths[self.image_idx] == img_path:
+                iw, ih = self.image.size
+            else:
+                size = self._size_cache.get(img_path)
+                if size is None:
+                    size = self._size_cache[img_path] = probe_image_size(img_path)   # header only, no decode
+                iw, ih = size
         except Exception:
-            im = self.image
-        if im is None: return
+            if self.image is None: return
+            iw, ih = self.image.size
         txt_path = self._yolo_txt_path_for(img_path)
-        iw, ih = im.size
-        lines = []
-        for b in boxes:
-            cx = (b.x1 + b.x2) / 2.0 / iw
-            cy = (b.y1 + b.y2) / 2.0 / ih
-            nw = (b.x2 - b.x1) / iw
-            nh = (b.y2 - b.y1) / ih
-            lines.append(f"{b.cls} {cx:.6f} {cy:.6f} {nw:.6f} {nh:.6f}")
-        with open(txt_path, "w", encoding="utf-8") as f:
-            f.write("\n".join(lines) + ("\n" if lines else ""))
+        body = "".join(self._yolo_lines(boxes, iw, ih))
+        with self._save_lock:
+            # callers flush the queue first, so no pending write can land after this one
+            if not self._label_unchanged(txt_path, body):
+                write_label_file(txt_path, body)
+                self._record_label_write(txt_path, body)
         if self.image_paths and 0 <= self.image_idx < len(self.image_paths):
             if os.path.abspath(img_path) == os.path.abspath(self.image_paths[self.image_idx]):
                 self.dirty = False
 
+    @staticmethod
+    def _yolo_lines(boxes: List[Box], iw: int, ih: int) -> List[str]:
+        """Newline-terminated 'cls cx cy w h' lines; coordinates computed for all boxes at once."""
+        if not boxes:
+            return []
+        if not _NP_OK:
+            return ["%d %.6f %.6f %.6f %.6f\n" % (b.cls, (b.x1 + b.x2) / 2.0 / iw, (b.y1 + b.y2) / 2.0 / ih,
+                                                   (b.x2 - b.x1) / iw, (b.y2 - b.y1) / ih) for b in boxes]
+        a = np.array([(b.x1, b.y1, b.x2, b.y2) for b in boxes], dtype=np.float64)
+        norm = np.column_stack(((a[:, 0] + a[:, 2]) / 2.0 / iw, (a[:, 1] + a[:, 3]) / 2.0 / ih,
+                                (a[:, 2] - a[:, 0]) / iw, (a[:, 3] - a[:, 1]) / ih)).tolist()
+        return ["%d %.6f %.6f %.6f %.6f\n" % (b.cls, cx, cy, nw, nh) for b, (cx, cy, nw, nh) in zip(boxes, norm)]
+
+    @staticmethod
+    def _yolo_rows_to_snap(rows, iw: int, ih: int) -> List[Tuple[int,int,int,int,int]]:
+        """(N,5) normalized 'cls cx cy w h' rows -> clipped pixel (x1,y1,x2,y2,cls), degenerate boxes dropped."""
+        a = np.asarray(rows, dtype=np.float64).reshape(-1, 5)
+        cls = a[:, 0].astype(np.int64)
+        cx = a[:, 1] * iw; cy = a[:, 2] * ih
+        w  = a[:, 3] * iw; h  = a[:, 4] * ih
+        x1 = np.clip(np.rint(cx - w/2), 0, iw-1).astype(np.int64)
+        y1 = np.clip(np.rint(cy - h/2), 0, ih-1).astype(np.int64)
+        x2 = np.clip(np.rint(cx + w/2), 0, iw-1).astype(np.int64)
+        y2 = np.clip(np.rint(cy + h/2), 0, ih-1).astype(np.int64)
+        valid = (x2 > x1) & (y2 > y1)
+        out = np.column_stack((x1, y1, x2, y2, cls))[valid]
+        return [tuple(r) for r in out.tolist()]
+
     def _read_yolo_txt_for_path(self, img_path: str, img_size: Tuple[int,int]) -> List[Tuple[int,int,int,int,int]]:
         txt_path = self._yolo_txt_path_for(img_path)
         if not os.path.exists(txt_path): return []
         iw, ih = img_size
-        snap: List[Tuple[int,int,int,int,int]] = []
         with open(txt_path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line: continue
-                parts = line.split()
-                if len(parts) != 5: continue
-                cls = int(float(parts[0]))
-                cx = float(parts[1]) * iw
-                cy = float(parts[2]) * ih
-                w  = float(parts[3]) * iw
-                h  = float(parts[4]) * ih
-                x1 = int(round(cx - w/2)); y1 = int(round(cy - h/2))
-                x2 = int(round(cx + w/2)); y2 = int(round(cy + h/2))
-                x1 = max(0, min(iw-1, x1)); y1 = max(0, min(ih-1, y1))
-                x2 = max(0, min(iw-1, x2)); y2 = max(0, min(ih-1, y2))
-                if x2 <= x1 or y2 <= y1: continue
-                snap.append((x1,y1,x2,y2,cls))
+            text = f.read()
+        if _NP_OK:
+            return self._yolo_rows_to_snap(yolo_rows_array(text), iw, ih)
+        rows = yolo_rows(text)
+        snap: List[Tuple[int,int,int,int,int]] = []
+        for k in range(0, len(rows), 5):
+            cls = int(rows[k])
+            cx = rows[k + 1] * iw
+            cy = rows[k + 2] * ih
+            w  = rows[k + 3] * iw
+            h  = rows[k + 4] * ih
+            x1 = int(round(cx - w/2)); y1 = int(round(cy - h/2))
+            x2 = int(round(cx + w/2)); y2 = int(round(cy + h/2))
+            x1 = max(0, min(iw-1, x1)); y1 = max(0, min(ih-1, y1))
+            x2 = max(0, min(iw-1, x2)); y2 = max(0, min(ih-1, y2))
+            if x2 <= x1 or y2 <= y1: continue
+            snap.append((x1,y1,x2,y2,cls))
         return snap
 
     def _autosave_current(self, silent: bool):
@@ -2007,7 +2786,10 @@ class LabelerApp(tk.Tk):
         img_path = self.image_paths[self.image_idx]
         try:
             self._remember_current()
-            self._write_yolo_txt_for_path(img_path, self.boxes)
+            # format now (boxes are about to change), write on the save thread
+            iw, ih = self.image.size
+            self._enqueue_save(self._yolo_txt_path_for(img_path), self._yolo_lines(self.boxes, iw, ih))
+            self.dirty = False
             if not silent and SHOW_STATUS_BAR:
                 self._set_status(f"Autosaved: {os.path.basename(self._yolo_txt_path_for(img_path))}")
         except Exception as ex:
@@ -2016,13 +2798,71 @@ class LabelerApp(tk.Tk):
                 try: messagebox.showwarning("Autosave failed", str(ex))
                 except Exception: pass
 
+    def _enqueue_save(self, txt_path: str, lines: List[str]):
+        body = "".join(lines)
+        h = hash(body)
+        with self._save_lock:
+            queued = self._pending_labels.get(txt_path)
+            # compare with the newest queued write for this path, else with what is on disk
+            if queued == h or (queued is None and self._label_unchanged(txt_path, body)):
+                return   # e.g. flipping through images without editing: nothing to rewrite
+            self._pending_labels[txt_path] = h
+            self._save_q.put((txt_path, body))
+
+    def _save_worker(self):
+        while True:
+            # drain whatever has queued up since the last pass; a path saved twice is written once
+            batch = dict([self._save_q.get()])
+            n = 1
+            while True:
+                try:
+                    txt_path, body = self._save_q.get_nowait()
+                except queue.Empty:
+                    break
+                batch.pop(txt_path, None)   # keep the newest body, in queue order
+                batch[txt_path] = body
+                n += 1
+            for txt_path, body in batch.items():
+                try:
+                    write_label_file(txt_path, body)
+                    with self._save_lock:
+                        self._record_label_write(txt_path, body)
+                except Exception as ex:
+                    log_exc("autosave", ex)
+                with self._save_lock:
+                    if self._pending_labels.get(txt_path) == hash(body):
+                        del self._pending_labels[txt_path]   # nothing newer was queued meanwhile
+            for _ in range(n):
+                self._save_q.task_done()
+
+    def _label_unchanged(self, txt_path: str, body: str) -> bool:
+        """True if we last wrote exactly this text to txt_path and the file hasn't been touched since."""
+        rec = self._saved_labels.get(txt_path)
+        if rec is None or rec[0] != hash(body):
+            return False
+        try:
+            return os.stat(txt_path).st_mtime_ns == rec[1]
+        except OSError:
+            return False
+
+    def _record_label_write(self, txt_path: str, body: str):
+        try:
+            self._saved_labels[txt_path] = (hash(body), os.stat(txt_path).st_mtime_ns)
+        except OSError:
+            self._saved_labels.pop(txt_path, None)
+
+    def _flush_saves(self):
+        """Block until queued autosaves hit disk (before a synchronous save or exit)."""
+        if self._save_thread.is_alive():
+            self._save_q.join()
+
     def _update_project_index_for_current(self):
         if not self.image_paths or self.image_idx < 0: return
         p = self.image_paths[self.image_idx]
         boxes_count = len(self.boxes)
-        classes_set = set(b.cls for b in self.boxes)
-        self.project_index[p] = {"boxes": boxes_count, "classes": classes_set}
-        self._rebuild_project_tree()
+        mask = class_mask(c for c, n in self._cls_hist.items() if n > 0)
+        self.project_index[p] = {"boxes": boxes_count, "mask": mask}
+        self._schedule_tree_rebuild()
 
     # ---------- history (undo/redo) ----------
     def _history_reset(self):
@@ -2030,35 +2870,45 @@ class LabelerApp(tk.Tk):
         self.redo_stack.clear()
 
     def _capture_snapshot_state(self) -> Dict:
-        classes_plain: Dict[int, Dict] = {}
+        # (name, color, show) tuples; hot on every structural edit, so keep the loop flat
+        accent, BV = PALETTE["accent"], tk.BooleanVar
+        classes_plain: Dict[int, Tuple[str, str, bool]] = {}
         for cid, info in self.classes.items():
-            classes_plain[int(cid)] = {
-                "name": str(info.get("name","")),
-                "color": str(info.get("color", PALETTE["accent"])),
-                "show": bool(info.get("show").get() if isinstance(info.get("show"), tk.BooleanVar) else True)
-            }
+            show = info.get("show")
+            classes_plain[int(cid)] = (str(info.get("name", "")), str(info.get("color", accent)),
+                                       bool(show.get()) if show.__class__ is BV else True)
+        # most edits touch boxes only: share one class table across consecutive undo entries
+        if classes_plain == self._last_classes_plain:
+            classes_plain = self._last_classes_plain
+        else:
+            self._last_classes_plain = classes_plain
+        # same for the packed boxes: a select/relabel/no-op click shares the previous entry's array
+        boxes = pack_snapshot(self._snapshot())
+        last = self._last_boxes_packed
+        if last is not None and _NP_OK and last.shape == boxes.shape and np.array_equal(last, boxes):
+            boxes = last
+        else:
+            self._last_boxes_packed = boxes
         return {
-            "boxes": self._snapshot(),
+            "boxes": boxes,
             "classes": classes_plain,
             "selected_cls": int(self.var_new_cls.get()) if self.classes else 0,
             "yolo_prefilled": bool(self._yolo_prefilled),
         }
 
     def _apply_snapshot_state(self, snap: Dict):
-        cls_plain: Dict[int, Dict] = snap.get("classes", {})
+        cls_plain: Dict[int, Tuple[str, str, bool]] = snap.get("classes", {})
         self.classes = {}
-        for cid, info in cls_plain.items():
-            self.classes[int(cid)] = {
-                "name": info.get("name",""),
-                "color": info.get("color", PALETTE["accent"]),
-                "show": tk.BooleanVar(value=bool(info.get("show", True)))
-            }
+        self._hidden_cache = None
+        for cid, (name, color, show) in cls_plain.items():
+            self.classes[int(cid)] = {"name": name, "color": color, "show": self._new_show_var(show)}
+        self._reset_class_ids()
         self._restore_from_snapshot(snap.get("boxes", []))
         sel = snap.get("selected_cls", 0)
         if self.classes and sel in self.classes:
             self.var_new_cls.set(sel)
         elif self.classes:
-            self.var_new_cls.set(sorted(self.classes)[0])
+            self.var_new_cls.set(min(self.classes))
         else:
             self.var_new_cls.set(0)
         self._yolo_prefilled = bool(snap.get("yolo_prefilled", False))
@@ -2068,9 +2918,15 @@ class LabelerApp(tk.Tk):
         self.redraw()
 
     def _push_undo(self):
-        self.undo_stack.append(self._capture_snapshot_state())
-        if len(self.undo_stack) > MAX_HISTORY:
-            self.undo_stack = self.undo_stack[-MAX_HISTORY:]
+        state = self._capture_snapshot_state()
+        top = self.undo_stack[-1] if self.undo_stack else None
+        # capture shares unchanged parts by identity, so a repeat of the top entry is cheap to spot
+        if (top is not None and top["boxes"] is state["boxes"] and top["classes"] is state["classes"]
+                and top["selected_cls"] == state["selected_cls"]
+                and top["yolo_prefilled"] == state["yolo_prefilled"]):
+            self.redo_stack.clear()
+            return   # e.g. clicking a box without dragging it: no empty undo step
+        self.undo_stack.append(state)
         self.redo_stack.clear()
 
     def on_undo(self):
@@ -2080,8 +2936,6 @@ class LabelerApp(tk.Tk):
         current = self._capture_snapshot_state()
         last = self.undo_stack.pop()
         self.redo_stack.append(current)
-        if len(self.redo_stack) > MAX_HISTORY:
-            self.redo_stack = self.redo_stack[-MAX_HISTORY:]
         self._apply_snapshot_state(last)
         self._set_status("Undo")
 
@@ -2092,8 +2946,6 @@ class LabelerApp(tk.Tk):
         current = self._capture_snapshot_state()
         nxt = self.redo_stack.pop()
         self.undo_stack.append(current)
-        if len(self.undo_stack) > MAX_HISTORY:
-            self.undo_stack = self.undo_stack[-MAX_HISTORY:]
         self._apply_snapshot_state(nxt)
         self._set_status("Redo")
 
@@ -2106,19 +2958,74 @@ class LabelerApp(tk.Tk):
         if not path: return
         self.var_model.set(path)
         self._set_status(f"Model selected: {os.path.basename(path)}")
+        if self.var_prefill.get() and _yolo_installed():
+            self._warmup_model(path)
+
+    def _warmup_model(self, path: str):
+        """Load + warm the model on the YOLO worker so the first Prefill doesn't pay for it."""
+        self._ensure_yolo_worker()
+        self._yolo_jobs.put((None, None, None, path))
+        self._set_status("Warming up model…")
+        if not (self._yolo_warming or self._prefill_running):
+            self.after(30, self._drain_yolo_results)
+        self._yolo_warming = True
 
     def _get_yolo_model(self, path: str):
-        key = os.path.abspath(path) + f"|{YOLO_DEVICE}|half={YOLO_HALF}"
+        # called from the prefill worker and the scan worker; load each model once
+        with self._yolo_model_lock:
+            return self._get_yolo_model_locked(path)
+
+    @staticmethod
+    def _int8_model_path_for(path: str) -> str:
+        """Where Ultralytics puts an OpenVINO INT8 export of <model>.pt."""
+        return os.path.splitext(path)[0] + "_int8_openvino_model"
+
+    def _on_device_changed(self, _evt=None):
+        # plain attribute: the workers read it, never the Tk variable
+        self._yolo_force_cpu = self.var_device.get() == "cpu"
+        self._set_status(f"YOLO device: {'cpu' if self._yolo_force_cpu else 'auto'}")
+
+    def _yolo_target(self) -> Tuple[str, bool]:
+        """(device, half) for loads and predicts; the first "auto" resolve imports torch."""
+        return ("cpu", False) if self._yolo_force_cpu else _auto_device()
+
+    @staticmethod
+    def _gpu_model_path_for(path: str) -> Optional[str]:
+        """A previously exported TensorRT engine (or ONNX, if onnxruntime is present) next to <model>.pt."""
+        stem = os.path.splitext(path)[0]
+        if os.path.isfile(stem + ".engine"):
+            return stem + ".engine"
+        if os.path.isfile(stem + ".onnx") and importlib.util.find_spec("onnxruntime") is not None:
+            return stem + ".onnx"
+        return None
+
+    def _get_yolo_model_locked(self, path: str):
+        device, half = self._yolo_target()
+        # on CPU prefer a previously exported INT8 model next to the .pt
+        if device == "cpu" and os.path.isdir(self._int8_model_path_for(path)):
+            path = self._int8_model_path_for(path)
+        elif device == "cuda" and path.endswith(".pt"):
+            path = self._gpu_model_path_for(path) or path
+        # mtime in the key: re-selecting the same file costs one stat, an overwritten file reloads
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            mtime = 0
+        base = os.path.abspath(path) + f"|{device}|half={half}"
+        key = f"{base}|{mtime}"
         mdl = self._yolo_model_cache.get(key)
         if mdl is not None:
             return mdl
-        from ultralytics import YOLO
+        for stale in [k for k in self._yolo_model_cache if k.rsplit("|", 1)[0] == base]:
+            del self._yolo_model_cache[stale]   # older copy of a file that changed on disk
+        if not _yolo_available():
+            raise RuntimeError("ultralytics is not installed")
         mdl = YOLO(path)
         try:
-            # put backbone on device; use fp16 on GPU
-            if YOLO_DEVICE == "cuda":
-                mdl.to("cuda")
-            if YOLO_HALF:
+            # put backbone on device once; use fp16 on CUDA
+            if device != "cpu":
+                mdl.to(device)
+            if half:
                 try: mdl.model.half()
                 except Exception: pass
             # fuse conv+bn for speed (safe at inference)
@@ -2126,75 +3033,88 @@ class LabelerApp(tk.Tk):
             except Exception: pass
         except Exception:
             pass
+        # first predict allocates workspaces / picks kernels; pay that here, off the UI thread
+        try:
+            mdl.predict(np.zeros((YOLO_IMG_SIZE, YOLO_IMG_SIZE, 3), np.uint8), imgsz=YOLO_IMG_SIZE,
+                        device=device, half=half, verbose=False)
+        except Exception as ex:
+            log_exc("yolo warmup", ex)
         self._yolo_model_cache[key] = mdl
         return mdl
-    def _detect_boxes_for_batch(self, pil_images, model):
-        import numpy as np
-        # Convert PIL -> np arrays once
-        arr_list = [np.array(im) for im in pil_images]
+    def _detect_boxes_for_batch(self, pil_images, model, batch_size=YOLO_BATCH):
 
         # Call YOLO once for the whole batch
-        res = model.predict(
-            source=arr_list,
-            imgsz=YOLO_IMG_SIZE,
-            conf=YOLO_CONF_THRESHOLD,
-            max_det=YOLO_MAX_DET,
-            device=YOLO_DEVICE,
-            half=YOLO_HALF,
-            verbose=False,
-            batch=YOLO_BATCH,
-            workers=0,      # no extra loaders; we already passed arrays
-            stream=False,
-        )
+        device, half = self._yolo_target()
+        with _inference_mode():
+            res = model.predict(
+                source=list(pil_images),   # PIL straight in: no extra HxWx3 copy per image
+                imgsz=YOLO_IMG_SIZE,
+                conf=YOLO_CONF_THRESHOLD,
+                max_det=YOLO_MAX_DET,
+                device=device,
+                half=half,
+                verbose=False,
+                batch=batch_size,
+                workers=0,      # no extra loaders; images are already decoded
+                stream=False,
+            )
 
         names = getattr(model, "names", {}) or {}
         out = []
 
         for im, r in zip(pil_images, res):
             iw, ih = im.size
-            boxes_out = []
-            if getattr(r, "boxes", None) is not None:
-                for b in r.boxes:
-                    try:
-                        cls_id = int(b.cls[0].item()) if hasattr(b, "cls") else None
-                        xyxy   = b.xyxy[0].tolist() if hasattr(b, "xyxy") else None
-                        xyxy   = self._sanitize_and_clip(xyxy, iw, ih)
-                        if cls_id is None or xyxy is None:
-                            continue
-
-                        # your special mapping
-                        nm_lower = str(names.get(cls_id, "")).lower()
-                        if cls_id not in (YOLO_UNLOCKED_ID, YOLO_LOCKED_ID):
-                            if "unlock" in nm_lower: cls_id = YOLO_UNLOCKED_ID
-                            elif "lock"  in nm_lower: cls_id = YOLO_LOCKED_ID
-
-                        x1, y1, x2, y2 = xyxy
-                        boxes_out.append(Box(x1, y1, x2, y2, cls=cls_id, selected=False))
-                    except Exception:
-                        pass
+            try:
+                boxes_out = self._boxes_from_result(r, names, iw, ih)
+            except Exception as ex:
+                log_exc("_detect_boxes_for_batch", ex)
+                boxes_out = []
             out.append((boxes_out, names))
         return out
 
+    def _boxes_from_result(self, r, names: Dict[int, str], iw: int, ih: int) -> List[Box]:
+        """Convert one Ultralytics Results to Boxes with a single tensor->NumPy pull."""
+        rb = getattr(r, "boxes", None) if r is not None else None
+        if rb is None or len(rb) == 0:
+            return []
+        # rb.data is (N,6) [x1,y1,x2,y2,conf,cls]: one device->host copy instead of one per field
+        data = rb.data.detach().cpu().numpy().reshape(-1, rb.data.shape[-1])
+        xyxy = data[:, :4].astype(np.float64)
+        cls = data[:, -1].astype(np.int32)
+
+        keep, xyxy_i = self._sanitize_batch(xyxy, iw, ih)
+        xs, ys, cls = xyxy_i[:, 0::2], xyxy_i[:, 1::2], cls[keep]
+
+        # your special mapping, resolved once per distinct class id
+        for cid in np.unique(cls):
+            cid = int(cid)
+            if cid in (YOLO_UNLOCKED_ID, YOLO_LOCKED_ID):
+                continue
+            nm_lower = str(names.get(cid, "")).lower() if names else ""
+            if "unlock" in nm_lower: cls[cls == cid] = YOLO_UNLOCKED_ID
+            elif "lock" in nm_lower: cls[cls == cid] = YOLO_LOCKED_ID
 
-    def _sanitize_and_clip(self, xyxy, iw, ih) -> Optional[Tuple[int,int,int,int]]:
-        if xyxy is None or len(xyxy) != 4: return None
-        x1, y1, x2, y2 = xyxy
-        for v in (x1, y1, x2, y2):
-            if v is None: return None
-            if isinstance(v, float) and (math.isnan(v) or math.isinf(v)): return None
-        x1 = int(max(0, min(iw - 1, round(x1))))
-        y1 = int(max(0, min(ih - 1, round(y1))))
-        x2 = int(max(0, min(iw - 1, round(x2))))
-        y2 = int(max(0, min(ih - 1, round(y2))))
-        if x2 < x1: x1, x2 = x2, x1
-        if y2 < y1: y1, y2 = y2, y1
-        if (x2 - x1) < MIN_SIDE or (y2 - y1) < MIN_SIDE: return None
-        return x1, y1, x2, y2
+        rows = np.column_stack((xs[:, 0], ys[:, 0], xs[:, 1], ys[:, 1], cls)).tolist()
+        return [Box.from_sorted(x1, y1, x2, y2, c) for x1, y1, x2, y2, c in rows]
+
+
+    @staticmethod
+    def _sanitize_batch(xyxy, iw: int, ih: int):
+        """(keep mask, clipped sorted int32 xyxy of kept rows): drop non-finite, round, clip, order, MIN_SIDE."""
+        finite = np.isfinite(xyxy).all(axis=1)
+        out = np.zeros((len(xyxy), 4), dtype=np.int32)
+        out[finite, 0::2] = np.clip(np.rint(xyxy[finite, 0::2]), 0, iw - 1)
+        out[finite, 1::2] = np.clip(np.rint(xyxy[finite, 1::2]), 0, ih - 1)
+        x1 = np.minimum(out[:, 0], out[:, 2]); x2 = np.maximum(out[:, 0], out[:, 2])
+        y1 = np.minimum(out[:, 1], out[:, 3]); y2 = np.maximum(out[:, 1], out[:, 3])
+        keep = finite & ((x2 - x1) >= MIN_SIDE) & ((y2 - y1) >= MIN_SIDE)
+        return keep, np.column_stack((x1, y1, x2, y2))[keep]
 
     def _detect_boxes_for_image(self, pil_image: Image.Image, model):
-        import numpy as np
-        arr = np.array(pil_image)
-        res = model.predict(source=arr, conf=YOLO_CONF_THRESHOLD, verbose=False, device="cpu")
+        device, half = self._yolo_target()
+        with _inference_mode():
+            res = model.predict(source=pil_image, imgsz=YOLO_IMG_SIZE, conf=YOLO_CONF_THRESHOLD,
+                                max_det=YOLO_MAX_DET, device=device, half=half, verbose=False)
         r0 = res[0]
         iw, ih = pil_image.size
         boxes_out: List[Box] = []
@@ -2203,28 +3123,16 @@ class LabelerApp(tk.Tk):
         if isinstance(names, list):
             names = {i:n for i,n in enumerate(names)}
 
-        if r0 and getattr(r0, "boxes", None) is not None:
-            for b in r0.boxes:
-                try:
-                    cls_id = int(b.cls[0].item()) if hasattr(b,"cls") else None
-                    xyxy = b.xyxy[0].tolist() if hasattr(b,"xyxy") else None
-                    xyxy = self._sanitize_and_clip(xyxy, iw, ih)
-                    if cls_id is None or xyxy is None: continue
-
-                    nm_lower = str(names.get(cls_id,"")).lower() if names else ""
-                    if cls_id not in (YOLO_UNLOCKED_ID, YOLO_LOCKED_ID):
-                        if "unlock" in nm_lower: cls_id = YOLO_UNLOCKED_ID
-                        elif "lock" in nm_lower: cls_id = YOLO_LOCKED_ID
-
-                    x1,y1,x2,y2 = xyxy
-                    boxes_out.append(Box(x1,y1,x2,y2,cls=cls_id,selected=False))
-                except Exception as ex:
-                    log_exc("_detect_boxes_iter", ex)
+        try:
+            boxes_out = self._boxes_from_result(r0, names, iw, ih)
+        except Exception as ex:
+            log_exc("_detect_boxes_iter", ex)
         return boxes_out, (names or {})
 
     def _set_classes_from_detections(self, cls_ids: List[int], names_map: Dict[int,str]):
         unique = sorted(set(cls_ids))
         self.classes = {}
+        self._hidden_cache = None
         for cid in unique:
             name = names_map.get(cid, None)
             if name: name = str(name)
@@ -2240,28 +3148,97 @@ class LabelerApp(tk.Tk):
                 name = name if name else f"class_{cid}"
                 color = self._auto_color_for(cid)
                 show = True
-            self.classes[cid] = {"name": name, "color": color, "show": tk.BooleanVar(value=show)}
+            self.classes[cid] = {"name": name, "color": color, "show": self._new_show_var(show)}
+        self._reset_class_ids()
         if self.classes:
-            self.var_new_cls.set(sorted(self.classes)[0])
-        self._rebuild_visibility_ui()
-        self._rebuild_newclass_ui()
+            self.var_new_cls.set(min(self.classes))
+        self._schedule(1, self._rebuild_visibility_ui)
+        self._schedule(1, self._rebuild_newclass_ui)
 
     def on_prefill_once(self):
         if self.image is None:
             messagebox.showwarning("YOLO prefill", "Open an image first."); return
-        if not (self.var_prefill.get() and _YOLO_OK and self.var_model.get().strip()):
+        if not (self.var_prefill.get() and self.var_model.get().strip() and _yolo_available()):
             messagebox.showwarning("YOLO prefill", "Enable prefill and select a valid model file first."); return
-        if self._prefill_running or self._scan_all_running:
-            self._set_status("Another prefill is running…"); return
+        with self._prefill_lock:
+            if self._prefill_running or self._scan_all_running:
+                self._set_status("Another prefill is running…"); return
+            self._prefill_running = True
+            self._prefill_seq += 1
+
+        # inference runs on the YOLO worker; the UI stays responsive meanwhile
+        path = self.image_paths[self.image_idx]
+        self._ensure_yolo_worker()
+        self._yolo_jobs.put((self._prefill_seq, path, self.image.copy(), self.var_model.get().strip()))
+        self._set_status("Prefilling with YOLO…")
+        self.after(30, self._drain_yolo_results)
+
+    def _ensure_yolo_worker(self):
+        if self._yolo_thread is not None and self._yolo_thread.is_alive():
+            return
+        self._yolo_thread = threading.Thread(target=self._yolo_worker, daemon=True)
+        self._yolo_thread.start()
 
-        self._prefill_running = True
+    def _yolo_worker(self):
+        while True:
+            job = self._yolo_jobs.get()
+            if job is None:
+                return
+            seq, path, pil_image, model_path = job
+            if pil_image is None:
+                # warmup job: load + dummy forward pass (see _get_yolo_model_locked)
+                try:
+                    self._get_yolo_model(model_path)
+                    self._yolo_results.put(("warm", None, model_path))
+                except BaseException as ex:
+                    log_exc("_yolo_worker warmup", ex)
+                    self._yolo_results.put(("warm", None, None))
+                continue
+            try:
+                model = self._get_yolo_model(model_path)
+                new_boxes, names_map = self._detect_boxes_for_image(pil_image, model)
+                self._yolo_results.put(("done", seq, path, new_boxes, names_map))
+            except BaseException as ex:
+                log_exc("_yolo_worker", ex)
+                self._yolo_results.put(("error", seq, path, str(ex)))
+
+    def _drain_yolo_results(self):
         try:
-            self._set_status("Prefilling with YOLO…"); self.update_idletasks()
-            model = self._get_yolo_model(self.var_model.get().strip())
-            new_boxes, names_map = self._detect_boxes_for_image(self.image, model)
+            while True:
+                msg = self._yolo_results.get_nowait()
+                kind, seq, path = msg[0], msg[1], msg[2]
+                if kind == "warm":
+                    self._yolo_warming = False
+                    if not self._prefill_running:
+                        self._set_status(f"Model ready: {os.path.basename(path)}" if path else "Model warmup failed.")
+                    continue
+                if seq != self._prefill_seq:
+                    continue  # stale job (image changed or newer prefill started)
+                with self._prefill_lock:
+                    self._prefill_running = False
+                if kind == "error":
+                    try: messagebox.showerror("YOLO prefill failed", msg[3])
+                    except Exception: pass
+                    self._set_status("Prefill failed.")
+                    break
+                _, _, _, new_boxes, names_map = msg
+                curp = self.image_paths[self.image_idx] if (self.image_paths and 0 <= self.image_idx < len(self.image_paths)) else None
+                if path != curp:
+                    self._set_status("Prefill discarded: image changed.")
+                    break
+                self._apply_prefill_result(new_boxes, names_map)
+                break
+        except queue.Empty:
+            pass
+        # prefill results break out to here: a warmup queued meanwhile still needs its reply drained
+        if self._prefill_running or self._yolo_warming:
+            self.after(30, self._drain_yolo_results)
 
+    def _apply_prefill_result(self, new_boxes: List[Box], names_map: Dict[int, str]):
+        try:
             self._push_undo()
             self.boxes = new_boxes
+            self._rebuild_cls_hist()
             self._set_classes_from_detections([b.cls for b in new_boxes], names_map)
 
             self._yolo_prefilled = True
@@ -2269,16 +3246,69 @@ class LabelerApp(tk.Tk):
             self.after_idle(self.redraw)
             self._set_status(f"Prefill complete. Boxes: {len(self.boxes)}")
         except BaseException as ex:
-            log_exc("on_prefill_once", ex)
+            log_exc("_apply_prefill_result", ex)
             try: messagebox.showerror("YOLO prefill failed", str(ex))
             except Exception: pass
-        finally:
-            self._prefill_running = False
+
+    def on_export_optimized(self):
+        if _auto_device()[0] == "cuda":
+            self.on_export_engine()
+        else:
+            self.on_export_int8()
+
+    def on_export_int8(self):
+        """One-off OpenVINO INT8 export; later CPU runs load it instead of the .pt."""
+        self._run_export("INT8", dict(format="openvino", int8=True, imgsz=YOLO_IMG_SIZE))
+
+    def on_export_engine(self):
+        """One-off TensorRT FP16 export (ONNX when TensorRT is missing); later CUDA runs load it."""
+        if importlib.util.find_spec("tensorrt") is not None:
+            # dynamic batch up to the spinbox ceiling, so raising "Scan batch" later still fits the engine
+            self._run_export("TensorRT", dict(format="engine", half=True, dynamic=True,
+                                              batch=SCAN_MAX_BATCH, imgsz=YOLO_IMG_SIZE))
+        else:
+            self._run_export("ONNX", dict(format="onnx", dynamic=True, imgsz=YOLO_IMG_SIZE))
+
+    def _run_export(self, label: str, kwargs: Dict):
+        path = self.var_model.get().strip()
+        if not (path and _yolo_available()):
+            messagebox.showwarning(f"Export {label}", "Select a valid model file first."); return
+        if self._export_running:
+            self._set_status("Export already running…"); return
+        self._export_running = True
+        results = queue.Queue()
+
+        def work():
+            try:
+                out = YOLO(path).export(**kwargs)
+                results.put(("done", str(out)))
+            except BaseException as ex:
+                log_exc("_run_export", ex)
+                results.put(("error", str(ex)))
+
+        def poll():
+            try:
+                kind, val = results.get_nowait()
+            except queue.Empty:
+                self.after(200, poll); return
+            self._export_running = False
+            if kind == "error":
+                self._set_status(f"{label} export failed.")
+                try: messagebox.showerror(f"Export {label}", val)
+                except Exception: pass
+                return
+            with self._yolo_model_lock:
+                self._yolo_model_cache.clear()   # next load picks up the exported model
+            self._set_status(f"{label} model: {os.path.basename(val)}")
+
+        threading.Thread(target=work, daemon=True).start()
+        self._set_status(f"Exporting {label} model…")
+        self.after(200, poll)
 
     def on_scan_all(self):
         if not self.image_paths:
             messagebox.showwarning("Scan All", "Load images first."); return
-        if not (self.var_prefill.get() and _YOLO_OK and self.var_model.get().strip()):
+        if not (self.var_prefill.get() and self.var_model.get().strip() and _yolo_available()):
             messagebox.showwarning("Scan All", "Enable prefill and select a valid model file first."); return
         if self._prefill_running or self._scan_all_running:
             self._set_status("Another prefill is running…"); return
@@ -2288,10 +3318,16 @@ class LabelerApp(tk.Tk):
 
         paths = list(self.image_paths)
         model_path = self.var_model.get().strip()
+        try:
+            batch_size = min(SCAN_MAX_BATCH, max(1, int(self.var_batch.get())))   # typed values can pass the spinbox range
+        except Exception:
+            batch_size = YOLO_BATCH
+
+        self._flush_saves()   # queued autosaves must not overwrite scan output
 
         # start worker
         self._scan_thread = threading.Thread(
-            target=self._scan_all_worker, args=(paths, model_path), daemon=True
+            target=self._scan_all_worker, args=(paths, model_path, batch_size), daemon=True
         )
         self._scan_thread.start()
 
@@ -2300,12 +3336,18 @@ class LabelerApp(tk.Tk):
 
     # ---------- VIEW / ZOOM / PAN ----------
     def canvas_size(self) -> Tuple[int,int]:
+        if self._canvas_wh is not None:
+            return self._canvas_wh   # kept current by <Configure>; saves two winfo round-trips
         return (int(self.canvas.winfo_width()), int(self.canvas.winfo_height()))
 
     def _compute_base_scale(self):
         if self.image is None: return
         cw, ch = self.canvas_size()
         iw, ih = self.image.size
+        key = (cw, ch, iw, ih, self.zoom)
+        if key == self._scale_key:
+            return   # window, image and zoom unchanged since the last call
+        self._scale_key = key
         self.base_scale = max(1e-9, min(cw / iw, ch / ih))
         self.scale = self.base_scale * self.zoom
 
@@ -2322,6 +3364,9 @@ class LabelerApp(tk.Tk):
         if self.image is None: return
         cw, ch = self.canvas_size()
         iw, ih = self.image.size
+        key = (cw, ch, iw, ih, self.scale, self.offset_x, self.offset_y)
+        if key == self._clamp_key:
+            return   # offsets already clamped for this layout
         disp_w, disp_h = iw * self.scale, ih * self.scale
         def clamp(off, canvas, disp):
             if disp <= canvas:
@@ -2331,30 +3376,87 @@ class LabelerApp(tk.Tk):
             return min(max(off, min_off), max_off)
         self.offset_x = clamp(self.offset_x, cw, disp_w)
         self.offset_y = clamp(self.offset_y, ch, disp_h)
+        self._clamp_key = (cw, ch, iw, ih, self.scale, self.offset_x, self.offset_y)
 
     def _clear_cache(self):
+        self._cancel_hq_resize()
+        self._pyramid = {}
         self._cached_disp_size = None
-        self._cached_pil = None
         self._cached_photo = None
+        self._surface_cache.clear()
+        self._hit_grid = None   # cell size depends on the image size
+
+    def _cancel_hq_resize(self):
+        if self._hq_after_id is not None:
+            try: self.after_cancel(self._hq_after_id)
+            except Exception: pass
+            self._hq_after_id = None
 
     def _ensure_image_surface(self):
         if self.image is None: return
         iw, ih = self.image.size
         disp_w, disp_h = int(max(1, iw * self.scale)), int(max(1, ih * self.scale))
-        need_resize = (self._cached_disp_size != (disp_w, disp_h)) or (self._cached_pil is None)
+        need_resize = (self._cached_disp_size != (disp_w, disp_h)) or (self._cached_photo is None)
 
         if need_resize:
-            self._cached_pil = self.image.resize((disp_w, disp_h), Image.NEAREST)
-            self._cached_photo = ImageTk.PhotoImage(self._cached_pil)
+            key = (id(self.image), disp_w, disp_h)
+            entry = self._surface_cache.get(key)
+            if entry is None:
+                # fast NEAREST while zooming; a smoother BILINEAR pass follows once zoom settles
+                pil = self._pyramid_source(self.scale).resize((disp_w, disp_h), Image.NEAREST)
+                entry = [ImageTk.PhotoImage(pil), False]
+                self._surface_cache[key] = entry
+                while len(self._surface_cache) > SURFACE_CACHE_SIZE:
+                    self._surface_cache.popitem(last=False)
+            else:
+                self._surface_cache.move_to_end(key)
+            self._cached_photo = entry[0]
             self._cached_disp_size = (disp_w, disp_h)
+            self._cancel_hq_resize()
+            if not entry[1]:
+                self._hq_after_id = self.after(80, self._refine_image_surface)
 
         if self._image_item is None:
             self._image_item = self.canvas.create_image(int(self.offset_x), int(self.offset_y),
                                                         image=self._cached_photo, anchor="nw", tags=("img",))
         else:
-            self.canvas.itemconfig(self._image_item, image=self._cached_photo)
+            if need_resize:
+                self.canvas.itemconfig(self._image_item, image=self._cached_photo)
+            # pan only moves the item; the bitmap is reused
             self.canvas.coords(self._image_item, int(self.offset_x), int(self.offset_y))
 
+    def _pyramid_source(self, scale: float) -> Image.Image:
+        """Smallest cached level that is still >= scale (each level halves the previous)."""
+        src = self.image
+        for k in PYRAMID_LEVELS:
+            if k < scale:
+                break
+            lvl = self._pyramid.get(k)
+            if lvl is None:
+                lvl = src.reduce(2)
+                self._pyramid[k] = lvl
+            src = lvl
+        return src
+
+    def _refine_image_surface(self):
+        self._hq_after_id = None
+        if self.image is None or self._cached_disp_size is None or self._image_item is None:
+            return
+        pil = self._pyramid_source(self.scale).resize(self._cached_disp_size, Image.BILINEAR)
+        self._cached_photo = self._photo_into(self._cached_photo, pil)   # same size: pasted in place
+        self.canvas.itemconfig(self._image_item, image=self._cached_photo)
+        entry = self._surface_cache.get((id(self.image),) + self._cached_disp_size)
+        if entry is not None and entry[0] is self._cached_photo:
+            entry[1] = True
+
+    @staticmethod
+    def _photo_into(photo: Optional[ImageTk.PhotoImage], pil: Image.Image) -> ImageTk.PhotoImage:
+        """Paste into the existing PhotoImage when sizes match; allocate a new one otherwise."""
+        if photo is not None and (photo.width(), photo.height()) == pil.size:
+            photo.paste(pil)
+            return photo
+        return ImageTk.PhotoImage(pil)
+
     def zoom_step(self, factor: float, anchor: str="center", at_canvas_xy: Optional[Tuple[int,int]]=None):
         if self.image is None: return
         self._compute_base_scale()
@@ -2426,46 +3528,69 @@ class LabelerApp(tk.Tk):
     def redraw(self):
         if self.image is None:
             self.canvas.delete("overlay")
-            self.canvas.delete("grid")
+            self._hide_grid()
             self.canvas.delete("snap")
+            self.canvas.delete("boxlayer")
+            self._forget_overlay_items()
+            self._drop_box_items()
+            self._overlay_item = None
+            self._overlay_key = None
+            self._refresh_class_maps()
             self._update_counts()
             return
     
+        self._refresh_class_maps()
+        vis = self._class_vis_map
         self._compute_base_scale()
         self._clamp_offsets()
         self._ensure_image_surface()
+        self._sync_arr()
     
         self.canvas.delete("overlay")
-        self.canvas.delete("grid")
         self.canvas.delete("snap")
+        self._forget_overlay_items()
     
         self._draw_grid_()
     
+        rects = self._canvas_rects()
+        self._draw_boxes_overlay(rects)
+        show_labels = self.show_box_labels.get()
+        sel_items, label_items = self._sel_items, self._label_items
+        sel_seen: Set[int] = set()
+        label_seen: Set[int] = set()
+        n_sel, sel_idx = 0, -1   # selection tally for the handles, taken in this same pass
         for idx, box in enumerate(self.boxes):
-            if box.cls not in self.classes: 
-                continue
-            if not self.classes[box.cls]["show"].get():
+            if box.selected:
+                n_sel += 1; sel_idx = idx
+            if not vis.get(box.cls, False):
                 continue
             
-            x1, y1 = self.img_to_canvas(box.x1, box.y1)
-            x2, y2 = self.img_to_canvas(box.x2, box.y2)
-            outline = self.classes[box.cls]["color"]
-            if box.selected: outline = PALETTE["warning"]
-            self.canvas.create_rectangle(x1,y1,x2,y2, outline=outline, width=2,
-                                         tags=(f"box-{idx}","box","overlay"))
-            self.canvas.tag_bind(f"box-{idx}", "<Button-1>", lambda e, i=idx: self.select_box(i))
-            if self.show_box_labels.get():
-                self._draw_box_label(box, x1, y1)
+            x1, y1, x2, y2 = rects[idx]
+            if box.selected:
+                # selected boxes stay live canvas items, drawn above the raster layer
+                item = sel_items.get(idx)
+                if item is None:
+                    sel_items[idx] = self.canvas.create_rectangle(x1,y1,x2,y2, outline=PALETTE["warning"], width=2,
+                                                                  tags=("box","boxitem"))
+                else:
+                    self.canvas.coords(item, x1, y1, x2, y2)
+                sel_seen.add(idx)
+            if show_labels and self._draw_box_label(idx, box, x1, y1):
+                label_seen.add(idx)
+        for idx in [i for i in sel_items if i not in sel_seen]:
+            self.canvas.delete(sel_items.pop(idx))
+        for idx in [i for i in label_items if i not in label_seen]:
+            self.canvas.delete(*label_items.pop(idx)[0])
+        self.canvas.tag_raise("boxitem")   # above the raster layer and this frame's grid
         # --- highlight duplicates 
         dup_pairs = self._find_duplicate_box_pairs()
         dup_idx = set([i for p in dup_pairs for i in p])
 
         for idx in dup_idx:
             b = self.boxes[idx]
-            if not self._box_visible(b):
+            if not vis.get(b.cls, False):
                 continue
-            x1, y1 = self.img_to_canvas(b.x1, b.y1)
-            x2, y2 = self.img_to_canvas(b.x2, b.y2)
+            x1, y1, x2, y2 = rects[idx]   # already projected for this frame
 
             # dashed outer halo
             self.canvas.create_rectangle(
@@ -2489,29 +3614,84 @@ class LabelerApp(tk.Tk):
                 tags=("overlay", "dup")
             )
 
-        selected_count = sum(1 for b in self.boxes if b.selected)
-        if selected_count == 1:
-            sel_idx = self._selected_index()
-            if sel_idx is not None and 0 <= sel_idx < len(self.boxes):
-                b = self.boxes[sel_idx]
-                if b.cls in self.classes and self.classes[b.cls]["show"].get():
-                    self._draw_handles_for(sel_idx, b)
+        if n_sel == 1:
+            b = self.boxes[sel_idx]
+            if vis.get(b.cls, False):
+                self._draw_handles_for(sel_idx, b)
     
         # 3) crosshair/cursor
         self._draw_crosshair()
         self._draw_cursor_plus()
     
-        self._update_counts()
-    
-        try:
-            if self.crosshair_on.get():
-                self.cross_btn.configure(text="✚  Cross-hair ON", style="ToggleOn.TButton")
-            else:
-                self.cross_btn.configure(text="✚  Cross-hair OFF", style="TButton")
-        except Exception:
-            pass
+        self._update_counts()   # cross-hair button is kept in sync by its variable trace
         
 
+    def _canvas_rects(self) -> List[List[int]]:
+        """Canvas-space [x1,y1,x2,y2] of every box; same truncation as img_to_canvas, one pass."""
+        s, ox, oy = self.scale, self.offset_x, self.offset_y
+        if _NP_OK and self.boxes_arr is not None and len(self.boxes_arr) == len(self.boxes):
+            a = self.boxes_arr[:, :4].astype(np.float64)
+            a[:, 0::2] = ox + a[:, 0::2] * s
+            a[:, 1::2] = oy + a[:, 1::2] * s
+            return a.astype(np.int64).tolist()
+        return [[int(ox + b.x1*s), int(oy + b.y1*s), int(ox + b.x2*s), int(oy + b.y2*s)] for b in self.boxes]
+
+    def _draw_boxes_overlay(self, rects: List[List[int]]):
+        """Stroke all unselected visible boxes into one RGBA image covering the canvas plus a pan margin."""
+        cw, ch = self.canvas_size()
+        cw, ch = max(1, cw), max(1, ch)
+        m = OVERLAY_PAN_MARGIN
+        # only unselected boxes are rastered: moving/resizing/nudging a selection keeps the cached layer
+        if _NP_OK and self.boxes_arr is not None:
+            arr = self.boxes_arr
+            boxes_key = arr[arr[:, 5] == 0, :5].tobytes()
+        else:
+            boxes_key = tuple((b.x1, b.y1, b.x2, b.y2, b.cls) for b in self.boxes if not b.selected)
+        # offsets stay out of the key: a pan moves the item, and only rebuilds once it leaves the margin
+        key = (cw, ch, self.scale, boxes_key,
+               tuple(self._class_color_map.items()), tuple(self._class_vis_map.items()))
+        ox0, oy0 = self._overlay_origin
+        lx = int(self.offset_x) - int(ox0) - m   # where the raster's top-left sits on the canvas now
+        ly = int(self.offset_y) - int(oy0) - m
+        covered = -2*m <= lx <= 0 and -2*m <= ly <= 0
+        if key != self._overlay_key or self._overlay_photo is None or not covered:
+            overlay = Image.new("RGBA", (cw + 2*m, ch + 2*m), (0, 0, 0, 0))
+            draw = ImageDraw.Draw(overlay)
+            vis = self._class_vis_map
+            for b, (x1, y1, x2, y2) in zip(self.boxes, rects):
+                if b.selected or not vis.get(b.cls, False):
+                    continue
+                if x2 < -m or y2 < -m or x1 >= cw + m or y1 >= ch + m:
+                    continue
+                draw.rectangle((x1 + m, y1 + m, x2 + m, y2 + m), outline=self._class_style(b.cls)[1], width=2)
+            self._overlay_photo = self._photo_into(self._overlay_photo, overlay)
+            self._overlay_key = key
+            self._overlay_origin = (self.offset_x, self.offset_y)
+            lx = ly = -m
+
+        if self._overlay_item is None:
+            self._overlay_item = self.canvas.create_image(lx, ly, image=self._overlay_photo,
+                                                          anchor="nw", tags=("boxlayer",))
+        else:
+            self.canvas.itemconfig(self._overlay_item, image=self._overlay_photo)
+            self.canvas.coords(self._overlay_item, lx, ly)
+        self.canvas.tag_raise(self._overlay_item)
+
+    def _drop_box_items(self):
+        self.canvas.delete("boxitem")
+        self._sel_items.clear()
+        self._label_items.clear()
+
+    def _forget_overlay_items(self):
+        """Drop ids of "overlay"-tagged items after a bulk delete so the next draw recreates them."""
+        self._cursor_items.clear()
+        self.marquee_id = None
+
+    def _hide_rubber(self):
+        if self.rubber_id is not None:
+            self.canvas.itemconfig(self.rubber_id, state="hidden")
+            self.rubber_id = None
+
     def _clear_marquee(self):
         if self.marquee_id is not None:
             try:
@@ -2523,9 +3703,11 @@ class LabelerApp(tk.Tk):
     def _update_marquee(self, event):
         if self.image is None:
             return
-        self._clear_marquee()
         sx, sy = self.img_to_canvas(*self.marquee_start)
         cx, cy = event.x, event.y
+        if self.marquee_id is not None:
+            self.canvas.coords(self.marquee_id, sx, sy, cx, cy)   # drag only moves the band
+            return
         self.marquee_id = self.canvas.create_rectangle(
             sx, sy, cx, cy,
             outline=PALETTE["accent"], width=2, dash=(5, 3),
@@ -2545,38 +3727,41 @@ class LabelerApp(tk.Tk):
         return (ax1 <= bx2 and ax2 >= bx1 and ay1 <= by2 and ay2 >= by1)
 
     def _draw_crosshair(self):
-        self.canvas.delete("xhair")
-        if not self.crosshair_on.get(): return
+        if not self.crosshair_on.get():
+            self._hide_cursor_layer("xhair"); return
         x, y = self.mouse_canvas_xy
         cw, ch = self.canvas_size()
-        self.canvas.create_line(x, 0, x, ch, fill=PALETTE["crosshair"], width=1, tags=("xhair","overlay"))
-        self.canvas.create_line(0, y, cw, y, fill=PALETTE["crosshair"], width=1, tags=("xhair","overlay"))
+        self._cursor_layer("xhair", ((x, 0, x, ch), (0, y, cw, y)), PALETTE["crosshair"])
 
     def _draw_cursor_plus(self):
-        self.canvas.delete("cursorplus")
-        if not self.cursor_hidden: return
+        if not self.cursor_hidden:
+            self._hide_cursor_layer("cursorplus"); return
         x, y = self.mouse_canvas_xy
         arm = 6
-        self.canvas.create_line(x, y - arm, x, y + arm, fill="#000000", width=1, tags=("cursorplus","overlay"))
-        self.canvas.create_line(x - arm, y, x + arm, y, fill="#000000", width=1, tags=("cursorplus","overlay"))
+        self._cursor_layer("cursorplus", ((x, y - arm, x, y + arm), (x - arm, y, x + arm, y)), "#000000")
+
+    def _cursor_layer(self, tag: str, lines, fill: str):
+        """Move the layer's existing lines on mouse motion; create them only on first use."""
+        ids = self._cursor_items.get(tag)
+        if ids:
+            for item, xy in zip(ids, lines):
+                self.canvas.coords(item, *xy)
+            self.canvas.tag_raise(tag)
+            return
+        self._cursor_items[tag] = [self.canvas.create_line(*xy, fill=fill, width=1, tags=(tag, "overlay"))
+                                   for xy in lines]
 
-    def _selected_index(self) -> Optional[int]:
-        for i, b in enumerate(self.boxes):
-            if b.selected: return i
-        return None
+    def _hide_cursor_layer(self, tag: str):
+        if self._cursor_items.pop(tag, None):
+            self.canvas.delete(tag)
+
+    def _selected_indices(self) -> List[int]:
+        """Indices of selected boxes in one scan; callers reuse it instead of re-walking the list."""
+        return [i for i, b in enumerate(self.boxes) if b.selected]
 
     def _draw_handles_for(self, idx: int, b: Box):
-        x1c, y1c = self.img_to_canvas(b.x1, b.y1)
-        x2c, y2c = self.img_to_canvas(b.x2, b.y2)
-        mx, my = (x1c + x2c)//2, (y1c + y2c)//2
-        centers = {
-            "nw": (x1c, y1c), "n": (mx, y1c), "ne": (x2c, y1c),
-            "w":  (x1c, my),               "e":  (x2c, my),
-            "sw": (x1c, y2c), "s": (mx, y2c), "se": (x2c, y2c),
-        }
-        r = HANDLE_SIZE // 2
-        for name, (cx, cy) in centers.items():
-            self.canvas.create_rectangle(cx-r, cy-r, cx+r, cy+r,
+        for name, hx1, hy1, hx2, hy2 in self._handle_rects(b):
+            self.canvas.create_rectangle(hx1, hy1, hx2, hy2,
                                          fill=PALETTE["warning"], outline=PALETTE["outline"],
                                          tags=(f"hdl-{name}", "handle", "overlay"))
             self.canvas.tag_bind(f"hdl-{name}", "<Button-1>",
@@ -2598,8 +3783,8 @@ class LabelerApp(tk.Tk):
 
     def _update_counts(self):
         total = len(self.boxes)
-        visible = sum(1 for b in self.boxes
-                      if b.cls in self.classes and self.classes[b.cls]["show"].get())
+        vis = self._class_vis_map
+        visible = sum(1 for b in self.boxes if vis.get(b.cls, False))
 
         # File name
         fname = os.path.basename(self.image_paths[self.image_idx]) \
@@ -2608,9 +3793,10 @@ class LabelerApp(tk.Tk):
         pos = f"{self.image_idx + 1}/{len(self.image_paths)}" \
               if (self.image_paths and 0 <= self.image_idx < len(self.image_paths)) else "0/0"
 
-        self.lbl_counts.config(
-            text=f"File: {fname}\nImage: {pos}\nBoxes: {total} (Visible: {visible})"
-        )
+        text = f"File: {fname}\nImage: {pos}\nBoxes: {total} (Visible: {visible})"
+        if text != self._counts_text:   # unchanged on most drag frames
+            self._counts_text = text
+            self.lbl_counts.config(text=text)
 
 
     # ---------- interactions ----------
@@ -2623,8 +3809,8 @@ class LabelerApp(tk.Tk):
     def on_canvas_leave(self, _event=None):
         self.canvas.configure(cursor="arrow")
         self.cursor_hidden = False
-        self.canvas.delete("cursorplus")
-        self.canvas.delete("xhair")
+        self._hide_cursor_layer("cursorplus")
+        self._hide_cursor_layer("xhair")
 
     def on_ctrl_down(self, _event=None):
         self.control_held = True
@@ -2673,6 +3859,7 @@ class LabelerApp(tk.Tk):
             self._set_status(f"No class for hotkey {digit}.")
 
     def on_press(self, event):
+        self._last_drag_key = None
         if self.image is None: return
         self.mouse_canvas_xy = (event.x, event.y)
         self._draw_cursor_plus()
@@ -2698,9 +3885,7 @@ class LabelerApp(tk.Tk):
         hit = self._hit_test_visible(imgx, imgy)
         # 
         if not self.shift_held and hit is None:
-            if any(b.selected for b in self.boxes):
-                for b in self.boxes:
-                    b.selected = False
+            if self._clear_selection():
                 self.redraw() 
         if self.shift_held:
             if hit is not None:
@@ -2712,7 +3897,8 @@ class LabelerApp(tk.Tk):
                     self._push_undo()
                     self.moving = True
                     self.move_start_img = (imgx, imgy)
-                    self.move_selected_indices = [i for i, b in enumerate(self.boxes) if b.selected]
+                    self.move_selected_indices = self._selected_indices()
+                    self._move_group_bbox = None
                     self.move_start_boxes = {i: (self.boxes[i].x1, self.boxes[i].y1,
                                                  self.boxes[i].x2, self.boxes[i].y2)
                                              for i in self.move_selected_indices}
@@ -2728,12 +3914,13 @@ class LabelerApp(tk.Tk):
         if hit is not None:
             self._push_undo()
             if not self.boxes[hit].selected:
-                for b in self.boxes: b.selected = False
+                self._clear_selection()
                 self.boxes[hit].selected = True
 
             self.moving = True
             self.move_start_img = (imgx, imgy)
-            self.move_selected_indices = [i for i, b in enumerate(self.boxes) if b.selected]
+            self.move_selected_indices = self._selected_indices()
+            self._move_group_bbox = None
             self.move_start_boxes = {i: (self.boxes[i].x1, self.boxes[i].y1,
                                          self.boxes[i].x2, self.boxes[i].y2)
                                      for i in self.move_selected_indices}
@@ -2745,11 +3932,28 @@ class LabelerApp(tk.Tk):
         self._update_rubber(event)
 
     def on_drag(self, event):
+        # coalesce like on_mouse_move: a fast drag applies only the newest position per idle turn
+        self._pending_drag = event
+        if not self._drag_scheduled:
+            self._drag_scheduled = True
+            self.after_idle(self._wrap(self._flush_drag))
+
+    def _flush_drag(self):
+        self._drag_scheduled = False
+        event, self._pending_drag = self._pending_drag, None
+        if event is not None:
+            self._apply_drag(event)
+
+    def _apply_drag(self, event):
         if self.image is None: return
+        # duplicate samples (same spot, same modifiers) would redo the exact same move/resize/rubber
+        key = (event.x, event.y, event.state, self.control_held, self.alt_held)
+        if key == self._last_drag_key:
+            return
+        self._last_drag_key = key
 
+        # branches that call redraw() repaint the cursor layers there; the rest draw them at the end
         self.mouse_canvas_xy = (event.x, event.y)
-        self._draw_cursor_plus()
-        if self.crosshair_on.get(): self._draw_crosshair()
 
         # Pan while Ctrl held
         if self.panning:
@@ -2773,6 +3977,8 @@ class LabelerApp(tk.Tk):
         # --- marquee selection drag
         if self.marquee_selecting:
             self._update_marquee(event)
+            self._draw_cursor_plus()
+            self._draw_crosshair()
             return
 
         if self.moving and self.move_selected_indices:
@@ -2781,10 +3987,12 @@ class LabelerApp(tk.Tk):
             dx, dy = imgx - sx, imgy - sy
 
             # Compute group bbox at proposed position
-            gx1 = min(self.move_start_boxes[i][0] for i in self.move_selected_indices) + dx
-            gy1 = min(self.move_start_boxes[i][1] for i in self.move_selected_indices) + dy
-            gx2 = max(self.move_start_boxes[i][2] for i in self.move_selected_indices) + dx
-            gy2 = max(self.move_start_boxes[i][3] for i in self.move_selected_indices) + dy
+            gb = self._move_group_bbox   # start bbox is fixed for the whole drag; computed on first motion
+            if gb is None:
+                rows = [self.move_start_boxes[i] for i in self.move_selected_indices]
+                gb = self._move_group_bbox = (min(r[0] for r in rows), min(r[1] for r in rows),
+                                              max(r[2] for r in rows), max(r[3] for r in rows))
+            gx1, gy1, gx2, gy2 = gb[0] + dx, gb[1] + dy, gb[2] + dx, gb[3] + dy
 
             add_dx_img = add_dy_img = 0
             self._clear_snap_hints()
@@ -2830,11 +4038,15 @@ class LabelerApp(tk.Tk):
             return
 
 
-        # Annotation rubber band
+        # Annotation rubber band (draws the cursor layers itself)
         if self.dragging:
             self._update_rubber(event)
+        else:
+            self._draw_cursor_plus()
+            self._draw_crosshair()
 
     def on_release(self, event):
+        self._flush_drag()   # land the last motion before finishing the gesture
         self._clear_snap_hints()
 
         if self.image is None: return
@@ -2862,13 +4074,22 @@ class LabelerApp(tk.Tk):
             ex, ey = self.canvas_to_img(event.x, event.y)
             x1, y1, x2, y2 = self._norm_rect(sx, sy, ex, ey)
             selected_now = 0
-            for b in self.boxes:
-                if b.cls in self.classes and not self.classes[b.cls]["show"].get():
-                    continue
-                if self._rects_intersect((b.x1, b.y1, b.x2, b.y2), (x1, y1, x2, y2)):
+            if _NP_OK:
+                hidden = self._hidden_mask()
+                for i in np.flatnonzero(marquee_mask(self.boxes_arr, hidden, x1, y1, x2, y2)):
+                    b = self.boxes[i]
                     if not b.selected:
                         b.selected = True
                         selected_now += 1
+            else:
+                hidden = self._hidden_classes()
+                for b in self.boxes:
+                    if b.cls in hidden:
+                        continue
+                    if self._rects_intersect((b.x1, b.y1, b.x2, b.y2), (x1, y1, x2, y2)):
+                        if not b.selected:
+                            b.selected = True
+                            selected_now += 1
             self._clear_marquee()
             self.redraw()
             self._set_status(f"Selected {selected_now} box(es).")
@@ -2878,6 +4099,7 @@ class LabelerApp(tk.Tk):
             self.moving = False
             self.move_selected_indices = []
             self.move_start_boxes = {}
+            self._move_group_bbox = None
             self.move_start_img = (0, 0)
             self._remember_current()
             self.redraw()
@@ -2894,16 +4116,14 @@ class LabelerApp(tk.Tk):
                 ey = sy + side * (1 if dy >= 0 else -1)
 
             if not self.classes:
-                if self.rubber_id is not None:
-                    self.canvas.delete(self.rubber_id); self.rubber_id = None
+                self._hide_rubber()
                 messagebox.showwarning("No labels", "Add a label first (CLASSES → Add label…) or run YOLO Prefill.")
                 self._set_status("Cannot create box: no labels.")
                 return
 
             cls_selected = self.var_new_cls.get()
             if cls_selected not in self.classes:
-                if self.rubber_id is not None:
-                    self.canvas.delete(self.rubber_id); self.rubber_id = None
+                self._hide_rubber()
                 messagebox.showwarning("Label missing", "Selected label no longer exists.")
                 return
 
@@ -2911,18 +4131,28 @@ class LabelerApp(tk.Tk):
             if nb.size_ok():
                 self._push_undo()
                 self.boxes.append(nb)
+                self._cls_hist[nb.cls] += 1
                 nm = self.classes[cls_selected]["name"]
                 self._set_status(f'Added box as {nm} ({cls_selected}).')
                 self._remember_current()
-            if self.rubber_id is not None:
-                self.canvas.delete(self.rubber_id); self.rubber_id = None
+            self._hide_rubber()
             self.redraw()
 
     def on_mouse_move(self, event):
-        self.mouse_canvas_xy = (event.x, event.y)
+        # coalesce: only the latest position between idle cycles gets drawn
+        self._pending_motion = (event.x, event.y)
+        if not self._motion_scheduled:
+            self._motion_scheduled = True
+            self.after_idle(self._process_motion)
+
+    def _process_motion(self):
+        self._motion_scheduled = False
+        if self._pending_motion is None:
+            return
+        self.mouse_canvas_xy = self._pending_motion
+        self._pending_motion = None
         self._draw_cursor_plus()
-        if self.crosshair_on.get():
-            self._draw_crosshair()
+        self._draw_crosshair()
 
     def _start_resize(self, idx:int, handle:str, _event):
         self._push_undo()  
@@ -2935,8 +4165,6 @@ class LabelerApp(tk.Tk):
 
     def _update_rubber(self, event):
         if self.image is None: return
-        if self.rubber_id is not None:
-            self.canvas.delete(self.rubber_id); self.rubber_id = None
     
         sx, sy = self.img_to_canvas(*self.drag_start)
         cx, cy = event.x, event.y
@@ -2959,44 +4187,132 @@ class LabelerApp(tk.Tk):
             cx = sx + side * (1 if dx >= 0 else -1)
             cy = sy + side * (1 if dy >= 0 else -1)
     
-        self.rubber_id = self.canvas.create_rectangle(
-            sx, sy, cx, cy, outline=PALETTE["warning"], width=2, dash=(3,2), tags=("overlay",)
-        )
+        if self._rubber_item is None:
+            # one persistent item (not tagged "overlay", so redraw leaves it alone); hidden between drags
+            self._rubber_item = self.canvas.create_rectangle(
+                sx, sy, cx, cy, outline=PALETTE["warning"], width=2, dash=(3,2), tags=("rubber",)
+            )
+        else:
+            self.canvas.coords(self._rubber_item, sx, sy, cx, cy)
+            if self.rubber_id is None:
+                self.canvas.itemconfig(self._rubber_item, state="normal")
+            self.canvas.tag_raise(self._rubber_item)   # snap hints may have been drawn since
+        self.rubber_id = self._rubber_item
         self._draw_crosshair()
         self._draw_cursor_plus()
     
 
+    def _sync_arr(self):
+        """Refresh the NumPy mirror of self.boxes used for hit-testing."""
+        if not _NP_OK:
+            self._hit_grid = None
+            return
+        old = self.boxes_arr
+        self.boxes_arr = boxes_to_array(self.boxes)
+        # redraws mostly follow pan/zoom/selection: keep the grid unless some box rect moved
+        if self._hit_grid is not None and (old is None or old.shape != self.boxes_arr.shape
+                                           or not np.array_equal(old[:, :4], self.boxes_arr[:, :4])):
+            self._hit_grid = None   # rebuilt lazily on the next dense hit-test
+
+    def _build_hit_grid(self):
+        """Map (gx, gy) cell -> sorted int array of box rows overlapping that cell."""
+        iw, ih = self.image.size
+        cell = max(1, max(iw, ih) // HIT_GRID_CELLS)
+        cells: Dict[Tuple[int,int], List[int]] = {}
+        g = self.boxes_arr[:, :4] // cell
+        for i, (gx1, gy1, gx2, gy2) in enumerate(g.tolist()):
+            for gx in range(gx1, gx2 + 1):
+                for gy in range(gy1, gy2 + 1):
+                    cells.setdefault((gx, gy), []).append(i)
+        self._hit_grid = (cell, {k: np.array(v, dtype=np.intp) for k, v in cells.items()})
+
+    def _hidden_classes(self) -> Set[int]:
+        """Class ids toggled off. Cached until a show var is written or the class table changes; don't mutate."""
+        if self._hidden_cache is None:
+            self._hidden_cache = {cid for cid, info in self.classes.items() if not info["show"].get()}
+        return self._hidden_cache
+
+    def _new_show_var(self, show: bool = True) -> tk.BooleanVar:
+        """Visibility var for a class entry about to enter self.classes; its writes drop the hidden-class cache."""
+        var = tk.BooleanVar(value=show)
+        var.trace_add("write", self._on_show_write)
+        self._hidden_cache = None
+        return var
+
+    def _on_show_write(self, *_):
+        self._hidden_cache = None
+
+    def _hidden_mask(self):
+        """Per-row bool mask of boxes whose class is toggled off."""
+        if self.boxes_arr is None or len(self.boxes_arr) != len(self.boxes):
+            self._sync_arr()
+        return np.isin(self.boxes_arr[:, 4], list(self._hidden_classes()))
+
+    def _visible_mask(self):
+        """Per-row bool mask of boxes drawn this frame (same rule as _box_visible)."""
+        if self.boxes_arr is None or len(self.boxes_arr) != len(self.boxes):
+            self._sync_arr()
+        return np.isin(self.boxes_arr[:, 4], [c for c, on in self._class_vis_map.items() if on])
+
     def _hit_test_visible(self, imgx:int, imgy:int)->Optional[int]:
+        if _NP_OK:
+            hidden = self._hidden_mask()
+            if len(self.boxes_arr) >= HIT_GRID_MIN_BOXES and self.image is not None:
+                if self._hit_grid is None:
+                    self._build_hit_grid()
+                cell, cells = self._hit_grid
+                rows = cells.get((imgx // cell, imgy // cell))
+                if rows is None:
+                    return None
+                i = topmost_hit(self.boxes_arr[rows], hidden[rows], imgx, imgy)
+                return int(rows[i]) if i >= 0 else None
+            i = topmost_hit(self.boxes_arr, hidden, imgx, imgy)
+            return i if i >= 0 else None
+        hidden = self._hidden_classes()
         for i in range(len(self.boxes)-1, -1, -1):
             b = self.boxes[i]
-            if b.cls in self.classes and not self.classes[b.cls]["show"].get():
+            if b.cls in hidden:
                 continue
-            if b.contains(imgx, imgy):
+            if b.x1 <= imgx <= b.x2 and b.y1 <= imgy <= b.y2:   # contains() inlined: no call per box
                 return i
         return None
 
     def _handle_hit_at_canvas(self, cx:int, cy:int) -> Optional[Tuple[int,str]]:
-        if sum(1 for b in self.boxes if b.selected) != 1:
-            return None
-
-        sel = self._selected_index()
+        # exactly one selected box, found in a single pass
+        sel = None
+        for i, b in enumerate(self.boxes):
+            if b.selected:
+                if sel is not None:
+                    return None
+                sel = i
         if sel is None: return None
         b = self.boxes[sel]
-        if b.cls not in self.classes or not self.classes[b.cls]["show"].get():
+        if b.cls not in self.classes or b.cls in self._hidden_classes():
+            return None
+        rects = self._handle_rects(b)
+        # nw is the top-left and se the bottom-right square: outside their span no handle can match
+        if not (rects[0][1] <= cx <= rects[-1][3] and rects[0][2] <= cy <= rects[-1][4]):
             return None
+        for name, hx1, hy1, hx2, hy2 in rects:
+            if hx1 <= cx <= hx2 and hy1 <= cy <= hy2:
+                return (sel, name)
+        return None
+
+    def _handle_rects(self, b: Box) -> Tuple[Tuple[str,int,int,int,int], ...]:
+        """(name, x1, y1, x2, y2) canvas squares of the 8 resize handles; memoized on box rect + view."""
+        key = (b.x1, b.y1, b.x2, b.y2, self.scale, self.offset_x, self.offset_y)
+        if self._handles_cache is not None and self._handles_cache[0] == key:
+            return self._handles_cache[1]
         x1c, y1c = self.img_to_canvas(b.x1, b.y1)
         x2c, y2c = self.img_to_canvas(b.x2, b.y2)
         mx, my = (x1c + x2c)//2, (y1c + y2c)//2
-        centers = {
-            "nw": (x1c, y1c), "n": (mx, y1c), "ne": (x2c, y1c),
-            "w":  (x1c, my),               "e":  (x2c, my),
-            "sw": (x1c, y2c), "s": (mx, y2c), "se": (x2c, y2c),
-        }
         r = HANDLE_SIZE // 2
-        for name, (hx, hy) in centers.items():
-            if hx - r <= cx <= hx + r and hy - r <= cy <= hy + r:
-                return (sel, name)
-        return None
+        rects = tuple((name, hx - r, hy - r, hx + r, hy + r) for name, hx, hy in (
+            ("nw", x1c, y1c), ("n", mx, y1c), ("ne", x2c, y1c),
+            ("w",  x1c, my),                  ("e",  x2c, my),
+            ("sw", x1c, y2c), ("s", mx, y2c), ("se", x2c, y2c)))
+        self._handles_cache = (key, rects)
+        return rects
 
     def _apply_resize(self, idx:int, handle:str, imgx:int, imgy:int, alt: bool = False):
         if self.image is None or self.resize_start_box is None: return
@@ -3005,101 +4321,90 @@ class LabelerApp(tk.Tk):
         sx1, sy1, sx2, sy2 = self.resize_start_box
         x1, y1, x2, y2 = sx1, sy1, sx2, sy2
 
-        tx = max(0, min(iw-1, imgx))
-        ty = max(0, min(ih-1, imgy))
-
-        def clamp_min_w_left(nx1):  return min(max(nx1, 0), x2 - MIN_SIDE)
-        def clamp_min_w_right(nx2): return max(min(nx2, iw-1), x1 + MIN_SIDE)
-        def clamp_min_h_top(ny1):   return min(max(ny1, 0), y2 - MIN_SIDE)
-        def clamp_min_h_bot(ny2):   return max(min(ny2, ih-1), y1 + MIN_SIDE)
-
-        if handle in ("n","s","w","e") and not alt:
-            if handle == "n": y1 = clamp_min_h_top(ty)
-            elif handle == "s": y2 = clamp_min_h_bot(ty)
-            elif handle == "w": x1 = clamp_min_w_left(tx)
-            elif handle == "e": x2 = clamp_min_w_right(tx)
+        iw1, ih1 = iw - 1, ih - 1
+        tx = 0 if imgx < 0 else (iw1 if imgx > iw1 else imgx)
+        ty = 0 if imgy < 0 else (ih1 if imgy > ih1 else imgy)
+
+        hx, hy = HANDLE_SIGNS[handle]
+        if alt and hx and hy:
+            # square from the opposite (anchor) corner
+            ax = sx2 if hx < 0 else sx1
+            ay = sy2 if hy < 0 else sy1
+            s = min(abs(tx - ax), abs(ty - ay))
+            s_max_x = ax if hx < 0 else (iw1 - ax)
+            s_max_y = ay if hy < 0 else (ih1 - ay)
+            s = max(MIN_SIDE, min(s, s_max_x, s_max_y))
+            nx = ax + hx * s; ny = ay + hy * s
+            x1, x2 = (nx, ax) if hx < 0 else (ax, nx)
+            y1, y2 = (ny, ay) if hy < 0 else (ay, ny)
         else:
-            if handle in ("nw","ne","sw","se") and alt:
-                if handle == "nw": ax, ay = sx2, sy2; sx = -1; sy = -1
-                elif handle == "ne": ax, ay = sx1, sy2; sx = +1; sy = -1
-                elif handle == "sw": ax, ay = sx2, sy1; sx = -1; sy = +1
-                else: ax, ay = sx1, sy1; sx = +1; sy = +1
-                s = min(abs(tx - ax), abs(ty - ay))
-                s_max_x = ax if sx < 0 else (iw-1 - ax)
-                s_max_y = ay if sy < 0 else (ih-1 - ay)
-                s = max(MIN_SIDE, min(s, s_max_x, s_max_y))
-                nx = ax + sx * s; ny = ay + sy * s
-                if handle == "nw": x1, y1, x2, y2 = nx, ny, ax, ay
-                elif handle == "ne": x1, y1, x2, y2 = ax, ny, nx, ay
-                elif handle == "sw": x1, y1, x2, y2 = nx, ay, ax, ny
-                else:                x1, y1, x2, y2 = ax, ay, nx, ny
-            else:
-                if handle == "nw":
-                    x1 = clamp_min_w_left(tx); y1 = clamp_min_h_top(ty)
-                elif handle == "ne":
-                    x2 = clamp_min_w_right(tx); y1 = clamp_min_h_top(ty)
-                elif handle == "sw":
-                    x1 = clamp_min_w_left(tx); y2 = clamp_min_h_bot(ty)
-                elif handle == "se":
-                    x2 = clamp_min_w_right(tx); y2 = clamp_min_h_bot(ty)
-                else:
-                    if handle == "n": y1 = clamp_min_h_top(ty)
-                    elif handle == "s": y2 = clamp_min_h_bot(ty)
-                    elif handle == "w": x1 = clamp_min_w_left(tx)
-                    elif handle == "e": x2 = clamp_min_w_right(tx)
+            # tx/ty are already inside the image; each moving edge only keeps MIN_SIDE to its opposite
+            if hx < 0:   x1 = min(tx, sx2 - MIN_SIDE)
+            elif hx > 0: x2 = max(tx, sx1 + MIN_SIDE)
+            if hy < 0:   y1 = min(ty, sy2 - MIN_SIDE)
+            elif hy > 0: y2 = max(ty, sy1 + MIN_SIDE)
 
         b.x1, b.y1, b.x2, b.y2 = int(x1), int(y1), int(x2), int(y2)
         if self.control_held:
             # Determine which edges are moving for this handle
-            move_left  = handle in ("w","nw","sw")
-            move_right = handle in ("e","ne","se")
-            move_top   = handle in ("n","nw","ne")
-            move_bot   = handle in ("s","sw","se")
+            move_left, move_right = hx < 0, hx > 0
+            move_top,  move_bot   = hy < 0, hy > 0
 
             xs, ys = self._build_snap_targets_canvas(skip_indices={idx})
             self._clear_snap_hints()
             x_hint = y_hint = None
+            # view transform in locals; same truncation as img_to_canvas / canvas_to_img(clamp_inside=False)
+            sc, ox, oy = self.scale, self.offset_x, self.offset_y
 
             if move_left or move_right:
-                x_left_c, _ = self.img_to_canvas(int(x1), int(y1))
-                x_right_c,_ = self.img_to_canvas(int(x2), int(y2))
+                x_left_c  = int(ox + int(x1) * sc)
+                x_right_c = int(ox + int(x2) * sc)
                 if move_left:
                     nx, on = self._snap_scalar(x_left_c, xs); 
                     if on:
                         x_hint = nx
                         # convert back to image space
-                        xi,_ = self.canvas_to_img(nx, 0, clamp_inside=False)
+                        xi = int((nx - ox) / sc)
                         x1 = min(xi, x2 - MIN_SIDE)
                 if move_right:
                     nx, on = self._snap_scalar(x_right_c, xs);
                     if on:
                         x_hint = nx
-                        xi,_ = self.canvas_to_img(nx, 0, clamp_inside=False)
+                        xi = int((nx - ox) / sc)
                         x2 = max(xi, x1 + MIN_SIDE)
 
             if move_top or move_bot:
-                _, y_top_c  = self.img_to_canvas(int(x1), int(y1))
-                _, y_bot_c  = self.img_to_canvas(int(x2), int(y2))
+                y_top_c = int(oy + int(y1) * sc)
+                y_bot_c = int(oy + int(y2) * sc)
                 if move_top:
                     ny, on = self._snap_scalar(y_top_c, ys);
                     if on:
                         y_hint = ny
-                        _, yi = self.canvas_to_img(0, ny, clamp_inside=False)
+                        yi = int((ny - oy) / sc)
                         y1 = min(yi, y2 - MIN_SIDE)
                 if move_bot:
                     ny, on = self._snap_scalar(y_bot_c, ys);
                     if on:
                         y_hint = ny
-                        _, yi = self.canvas_to_img(0, ny, clamp_inside=False)
+                        yi = int((ny - oy) / sc)
                         y2 = max(yi, y1 + MIN_SIDE)
 
             self._draw_snap_hints(x_hint, y_hint)
 
     # ---------- utility ----------
     def select_box(self, idx:int):
-        for i,b in enumerate(self.boxes):
-            b.selected = (i==idx)
+        self._clear_selection()
+        self.boxes[idx].selected = True
         self.redraw()
+
+    def _clear_selection(self) -> bool:
+        """Deselect everything in one pass, writing only boxes that were selected; True if any were."""
+        changed = False
+        for b in self.boxes:
+            if b.selected:
+                b.selected = False
+                changed = True
+        return changed
     def _open_quick_class_search(self, x_root: int, y_root: int, selected_count: int = 0):
         if not self.classes:
             try:
@@ -3364,24 +4669,30 @@ class LabelerApp(tk.Tk):
             return
 
         # If nothing selected and we right-click on a box, select just that box
-        if not any(b.selected for b in self.boxes) and hit is not None:
-            for i, b in enumerate(self.boxes):
-                b.selected = (i == hit)
+        sel = self._selected_indices()
+        if not sel and hit is not None:
+            self.boxes[hit].selected = True   # nothing else is selected
+            sel = [hit]
             self.redraw()
 
-        sel_count = sum(1 for b in self.boxes if b.selected)
-        self._open_quick_class_search(event.x_root, event.y_root, selected_count=sel_count)
+        self._open_quick_class_search(event.x_root, event.y_root, selected_count=len(sel))
 
 
     
 
     def on_delete_selected(self, event=None):
-        sel_count = sum(1 for b in self.boxes if b.selected)
+        sel = self._selected_indices()
+        sel_count = len(sel)
         if sel_count == 0:
             self._set_status("Delete: no selection.")
             return
         self._push_undo()
-        self.boxes = [b for b in self.boxes if not b.selected]
+        self._cls_hist.subtract(self.boxes[i].cls for i in sel)
+        if sel_count <= DELETE_INPLACE_MAX:
+            for i in reversed(sel):   # back to front: lower indices stay valid
+                del self.boxes[i]
+        else:
+            self.boxes[:] = [b for b in self.boxes if not b.selected]
         self._remember_current()
         self._set_status(f"Deleted {sel_count} selected box(es).")
         self.redraw()
@@ -3411,6 +4722,7 @@ class LabelerApp(tk.Tk):
 
         self._push_undo()
         self.boxes.clear()
+        self._cls_hist.clear()
         self._remember_current()
         self._set_status("Cleared boxes.")
         self.redraw()
@@ -3435,7 +4747,9 @@ class LabelerApp(tk.Tk):
 
         self._push_undo()
         for b in to_change:
+            self._cls_hist[b.cls] -= 1
             b.cls = cls_id
+        self._cls_hist[cls_id] += len(to_change)
         self._remember_current()
         self._set_status(
             f'Labeled {len(to_change)} box(es) as {self.classes[cls_id]["name"]} ({cls_id}).'
@@ -3445,7 +4759,7 @@ class LabelerApp(tk.Tk):
 
     def nudge_selected(self, dx:int, dy:int):
         if self.image is None: return
-        sel_idxs = [i for i, b in enumerate(self.boxes) if b.selected]
+        sel_idxs = self._selected_indices()
         if not sel_idxs:
             return
     
@@ -3463,7 +4777,7 @@ class LabelerApp(tk.Tk):
 
     # ---- copy / paste ----
     def copy_selected(self):
-        sel_idxs = [i for i, b in enumerate(self.boxes) if b.selected]
+        sel_idxs = self._selected_indices()
         if not sel_idxs:
             self._set_status("Copy: no selection.")
             return
@@ -3489,24 +4803,37 @@ class LabelerApp(tk.Tk):
         self.paste_count += 1
         off = self.paste_nudge * (self.paste_count % 6)
 
-        for b in self.boxes:
-            b.selected = False
+        self._clear_selection()
 
         self._push_undo()
         pasted_any = False
-        for (x1, y1, x2, y2, cls) in boxes_to_paste:
+        fallback_cls = min(self.classes)
+        if _NP_OK and len(boxes_to_paste) >= PASTE_NP_MIN:
+            # group paste: shift, clip and size-filter every box in one pass
+            a = np.asarray(boxes_to_paste, dtype=np.int64).reshape(-1, 5)
+            wh = a[:, 2:4] - a[:, 0:2]
+            n1 = np.clip(a[:, 0:2] + off, 0, (iw - 1, ih - 1))
+            n2 = np.clip(n1 + wh, 0, (iw - 1, ih - 1))
+            keep = ((n2 - n1) >= MIN_SIDE).all(axis=1)
+            rows = np.column_stack((n1, n2, a[:, 4]))[keep].tolist()
+        else:
+            rows = []
+            for (x1, y1, x2, y2, cls) in boxes_to_paste:
+                nx1 = max(0, min(iw - 1, x1 + off))
+                ny1 = max(0, min(ih - 1, y1 + off))
+                w = x2 - x1
+                h = y2 - y1
+                nx2 = max(0, min(iw - 1, nx1 + w))
+                ny2 = max(0, min(ih - 1, ny1 + h))
+                if nx2 - nx1 >= MIN_SIDE and ny2 - ny1 >= MIN_SIDE:
+                    rows.append((nx1, ny1, nx2, ny2, cls))
+        for (nx1, ny1, nx2, ny2, cls) in rows:
             if cls not in self.classes:
-                cls = sorted(self.classes)[0]
-            nx1 = max(0, min(iw - 1, x1 + off))
-            ny1 = max(0, min(ih - 1, y1 + off))
-            w = x2 - x1
-            h = y2 - y1
-            nx2 = max(0, min(iw - 1, nx1 + w))
-            ny2 = max(0, min(ih - 1, ny1 + h))
-            if nx2 - nx1 >= MIN_SIDE and ny2 - ny1 >= MIN_SIDE:
-                nb = Box(nx1, ny1, nx2, ny2, cls=cls, selected=True)
-                self.boxes.append(nb)
-                pasted_any = True
+                cls = fallback_cls
+            nb = Box(nx1, ny1, nx2, ny2, cls=cls, selected=True)
+            self.boxes.append(nb)
+            self._cls_hist[nb.cls] += 1
+            pasted_any = True
 
         if pasted_any:
             self._remember_current()
@@ -3525,7 +4852,8 @@ class LabelerApp(tk.Tk):
         src_path = self.image_paths[self.image_idx]
     
         try:
-            # Write YOLO labels only
+            # Write YOLO labels only; a queued autosave must not land after this write
+            self._flush_saves()
             self._write_yolo_txt_for_path(src_path, self.boxes)
         except Exception as ex:
             if not silent:
@@ -3550,5 +4878,7 @@ class LabelerApp(tk.Tk):
         return ok
 # ---------- main ----------
 if __name__ == "__main__":
+    # JIT/cache-load off the UI thread so the first big marquee or click doesn't stall
+    threading.Thread(target=warm_jit, daemon=True).start()
     app = LabelerApp()
     app.mainloop()